@@ -9,6 +9,7 @@ from __future__ import annotations
 import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from dotenv import load_dotenv
@@ -17,6 +18,9 @@ from agents.base import AgentResponse
 
 load_dotenv()
 
+# Submissions graded in flight at once; each is an independent LLM call
+BATCH_CONCURRENCY = 4
+
 BATCH_SYSTEM_PROMPT = """You are an IB examiner AI assistant helping a teacher grade student work.
 
 For each student submission, provide:
@@ -91,11 +95,12 @@ class BatchGradingAgent:
             )
 
         results = []
-        for sub in submissions:
-            result = self._grade_single(sub, subject, doc_type)
-            result["student_id"] = sub.get("student_id")
-            result["student_name"] = sub.get("student_name", "Unknown")
-            results.append(result)
+        with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+            graded = pool.map(lambda sub: self._grade_single(sub, subject, doc_type), submissions)
+            for sub, result in zip(submissions, graded):
+                result["student_id"] = sub.get("student_id")
+                result["student_name"] = sub.get("student_name", "Unknown")
+                results.append(result)
 
         class_summary = self.generate_class_summary(results)
 
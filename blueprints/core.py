@@ -9,11 +9,20 @@ from datetime import date, datetime
 
 logger = logging.getLogger(__name__)
 
-from flask import Blueprint, current_app, jsonify, redirect, render_template, request, send_from_directory, url_for
+from profile import IB_SUBJECTS, SubjectEntry
+
+from flask import (
+    Blueprint,
+    current_app,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_from_directory,
+    url_for,
+)
 from flask_login import login_required
 
-from helpers import current_user_id, generate_recommendation
-from profile import IB_SUBJECTS, SubjectEntry
 from db_stores import (
     ActivityLogDB,
     FlashcardDeckDB,
@@ -25,6 +34,7 @@ from db_stores import (
     StudyPlanDB,
     TopicProgressStoreDB,
 )
+from helpers import current_user_id, generate_recommendation
 from subject_config import get_syllabus_topics
 
 bp = Blueprint("core", __name__)
@@ -344,6 +354,19 @@ def cron_daily_analytics():
         return jsonify({"error": "Cron job failed."}), 500
 
 
+@bp.route("/api/cron/leaderboards", methods=["GET", "POST"])
+def cron_leaderboards():
+    if not _verify_cron_secret():
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        from db_stores import LeaderboardStoreDB
+        LeaderboardStoreDB.refresh()
+        return jsonify({"status": "ok", "job": "leaderboards"})
+    except Exception as e:
+        logger.error("Cron leaderboards failed: %s", e, exc_info=True)
+        return jsonify({"error": "Cron job failed."}), 500
+
+
 @bp.route("/api/cron/monthly-credits", methods=["GET", "POST"])
 def cron_monthly_credits():
     if not _verify_cron_secret():
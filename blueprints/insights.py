@@ -11,12 +11,6 @@ logger = logging.getLogger(__name__)
 from flask import Blueprint, jsonify, redirect, render_template, request, url_for
 from flask_login import login_required
 
-from helpers import (
-    current_user_id,
-    generate_recommendation,
-    _generate_text_insights,
-)
-from extensions import EngineManager
 from db_stores import (
     GradeDetailLogDB,
     GradeHistoryDB,
@@ -24,8 +18,15 @@ from db_stores import (
     TopicProgressStoreDB,
     WritingProfileDB,
 )
+from extensions import EngineManager
+from helpers import (
+    _generate_text_insights,
+    current_user_id,
+    generate_recommendation,
+)
 from subject_config import get_subject_config, get_syllabus_topics
 
+
 def _compute_user_analytics(history_records: list[dict]) -> dict:
     """Compute analytics from a user's grade history records."""
     if not history_records:
@@ -79,7 +80,7 @@ def api_insights():
         # Compute analytics from the current user's grade history
         # (not the singleton grader which is locked to user_id=1)
         grade_history = GradeHistoryDB(uid)
-        raw_history = grade_history.history
+        raw_history = grade_history.scores()
         analytics_data = _compute_user_analytics(raw_history)
 
         history = []
@@ -331,10 +332,11 @@ def api_share_summary():
     """Generate a shareable summary token."""
     try:
         uid = current_user_id()
-        from predictive_analytics import PredictiveGradeModel
-        from database import get_db
         import json
 
+        from database import get_db
+        from predictive_analytics import PredictiveGradeModel
+
         model = PredictiveGradeModel()
         predictions = model.predict_total_ib_score(uid)
         patterns = model.study_pattern_analysis(uid)
@@ -370,6 +372,7 @@ def api_share_summary():
 def view_shared_summary(token):
     """Public shareable summary page (no auth required)."""
     import json
+
     from database import get_db
 
     db = get_db()
@@ -8,16 +8,24 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-from flask import Blueprint, Response, abort, jsonify, render_template, request
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+)
 from flask_login import login_required
 
-from helpers import current_user_id, teacher_required
 from db_stores import (
     AssignmentStoreDB,
     ClassStoreDB,
     GamificationProfileDB,
     StudentProfileDB,
 )
+from helpers import current_user_id, teacher_required
 
 bp = Blueprint("teacher", __name__)
 
@@ -182,9 +190,8 @@ def api_teacher_export_csv(class_id):
     cls = ClassStoreDB.get(class_id)
     if not cls or cls["teacher_id"] != uid:
         abort(404)
-    csv_data = ClassStoreDB.export_class_csv(class_id)
     return Response(
-        csv_data,
+        stream_with_context(ClassStoreDB.iter_class_csv(class_id)),
         mimetype="text/csv",
         headers={"Content-Disposition": f"attachment; filename=class_{class_id}_report.csv"},
     )
@@ -194,8 +201,9 @@ def api_teacher_export_csv(class_id):
 @teacher_required
 def api_admin_analytics_export():
     """Export anonymized platform analytics (teacher/admin only)."""
-    from data_pipeline import export_anonymized_analytics
     from flask import current_app
+
+    from data_pipeline import export_anonymized_analytics
     data = export_anonymized_analytics(current_app._get_current_object())
     return jsonify(data)
 
@@ -242,7 +250,7 @@ def api_teacher_batch_grade():
     if not cls or cls["teacher_id"] != uid:
         abort(404)
 
-    from credit_store import CreditStoreDB, FEATURE_COSTS
+    from credit_store import FEATURE_COSTS, CreditStoreDB
     cost_per = FEATURE_COSTS.get("batch_grade_per_student", 20)
     total_cost = cost_per * len(submissions)
     store = CreditStoreDB(uid)
@@ -91,6 +91,15 @@ class BaseConfig:
 
     FEATURE_FLAGS = FEATURE_FLAGS
 
+    # Threads for deferred per-upload work (writing style analysis); 0 = inline
+    BACKGROUND_WORKERS = int(os.environ.get("BACKGROUND_WORKERS", "2"))
+
+    # Idle SQLite connections kept per worker process for reuse; 0 disables
+    SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "8"))
+
+    # Seconds to coalesce counter bumps (e.g. paper downloads); 0 writes through
+    COUNTER_FLUSH_INTERVAL = float(os.environ.get("COUNTER_FLUSH_INTERVAL", "0.1"))
+
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
@@ -122,11 +131,16 @@ class ProductionConfig(BaseConfig):
 class VercelConfig(ProductionConfig):
     """Vercel serverless deployment."""
     SESSION_TYPE = None  # Prevent Flask-Session filesystem attempts
+    COUNTER_FLUSH_INTERVAL = 0  # No background threads between invocations
+    BACKGROUND_WORKERS = 0
 
 
 class TestingConfig(BaseConfig):
     TESTING = True
     WTF_CSRF_ENABLED = False
+    COUNTER_FLUSH_INTERVAL = 0
+    SQLITE_POOL_SIZE = 0
+    BACKGROUND_WORKERS = 0
 
 
 config_by_name = {
@@ -15,7 +15,6 @@ from flask_login import current_user
 
 from database import get_db
 
-
 FEATURE_COSTS = {
     "oral_practice": 50,
     "examiner_review": 500,
@@ -56,9 +55,13 @@ class CreditStoreDB:
         """Check if user has at least `amount` credits."""
         return self.balance() >= amount
 
-    def debit(self, amount: int, feature: str, description: str = "") -> dict:
-        """Deduct credits. Returns {success, balance_after, tx_id}."""
-        self._ensure()
+    def debit(self, amount: int, feature: str, description: str = "",
+              commit: bool = True) -> dict:
+        """Deduct credits. Returns {success, balance_after, tx_id}.
+
+        With ``commit=False`` the ledger writes are left in the open
+        transaction for the caller to commit alongside its own writes.
+        """
         db = get_db()
         current = self.balance()
         if current < amount:
@@ -77,7 +80,8 @@ class CreditStoreDB:
             "VALUES (?, ?, 'usage', ?, ?, ?, ?)",
             (self.user_id, -amount, feature, description, new_balance, now),
         )
-        db.commit()
+        if commit:
+            db.commit()
         return {"success": True, "balance_after": new_balance, "tx_id": cur.lastrowid}
 
     def credit(self, amount: int, tx_type: str = "purchase", description: str = "") -> dict:
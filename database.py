@@ -12,6 +12,8 @@ try:
 except ImportError:
     fcntl = None  # Not available on all runtimes (e.g. Vercel)
 import json
+import os
+import queue
 import sqlite3
 from datetime import datetime
 from pathlib import Path
@@ -20,6 +22,30 @@ from flask import current_app, g
 
 SESSION_DIR = Path(__file__).parent / "session_data"
 
+# sqlite3 keeps an LRU of prepared statements per connection keyed by SQL
+# text. The stores issue several hundred distinct statements, well past the
+# default of 128, so size the cache to avoid re-preparing on hot paths.
+STATEMENT_CACHE_SIZE = 512
+
+# Applied to every new SQLite connection. In WAL mode synchronous=NORMAL
+# fsyncs at checkpoints rather than on every commit; commits stay atomic and
+# durable against application crashes, but the last transactions may roll
+# back after a power loss. mmap lets the analytics reads skip the pread path.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA mmap_size=268435456",   # 256 MiB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",     # 64 MiB
+)
+
+# Idle SQLite connections kept for reuse, per process and database file.
+# Opening one re-reads and parses the whole schema (~1.7 ms), which is most of
+# the database cost of a short request. Sized by SQLITE_POOL_SIZE (0 = off);
+# keyed by pid so a forked worker never reuses its parent's connections.
+_sqlite_pools: dict[tuple[int, str], queue.LifoQueue] = {}
+
 
 SCHEMA = """
 -- Migration tracking
@@ -1001,9 +1027,259 @@ MIGRATIONS: list[tuple[int, str]] = [
         );
         CREATE INDEX IF NOT EXISTS idx_comments_post ON community_comments(post_id);
     """),
+
+    # Migration 41: Normalized badge awards (append-only, replaces JSON blob)
+    (41, """
+        CREATE TABLE IF NOT EXISTS user_badges (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            badge_id TEXT NOT NULL,
+            awarded_at TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY(user_id, badge_id)
+        );
+    """),
+
+    # Migration 42: Partial index so unread_count is an index-only scan
+    # (flashcards.due_count is already served by idx_flashcards_user_review)
+    (42, """
+        CREATE INDEX IF NOT EXISTS idx_notif_user_unread ON notifications(user_id, dismissed, read)
+            WHERE read = 0 AND dismissed = 0;
+    """),
+
+    # Migration 43: Trigger-maintained unread notification counter
+    (43, """
+        CREATE TABLE IF NOT EXISTS counters (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            key TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(user_id, key)
+        );
+        INSERT OR REPLACE INTO counters (user_id, key, value)
+            SELECT user_id, 'unread', COUNT(*) FROM notifications
+            WHERE read = 0 AND dismissed = 0 GROUP BY user_id;
+
+        CREATE TRIGGER IF NOT EXISTS trg_notif_unread_insert
+        AFTER INSERT ON notifications
+        WHEN NEW.read = 0 AND NEW.dismissed = 0
+        BEGIN
+            INSERT INTO counters (user_id, key, value) VALUES (NEW.user_id, 'unread', 1)
+                ON CONFLICT(user_id, key) DO UPDATE SET value = value + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_notif_unread_update
+        AFTER UPDATE OF read, dismissed ON notifications
+        WHEN (OLD.read = 0 AND OLD.dismissed = 0) <> (NEW.read = 0 AND NEW.dismissed = 0)
+        BEGIN
+            INSERT INTO counters (user_id, key, value) VALUES (NEW.user_id, 'unread', 0)
+                ON CONFLICT(user_id, key) DO NOTHING;
+            UPDATE counters
+                SET value = value + (CASE WHEN NEW.read = 0 AND NEW.dismissed = 0 THEN 1 ELSE -1 END)
+                WHERE user_id = NEW.user_id AND key = 'unread';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_notif_unread_delete
+        AFTER DELETE ON notifications
+        WHEN OLD.read = 0 AND OLD.dismissed = 0
+        BEGIN
+            UPDATE counters SET value = value - 1
+                WHERE user_id = OLD.user_id AND key = 'unread';
+        END;
+    """),
+
+    # Migration 44: Covering indexes for class analytics (grades joined via
+    # class_members, whose (class_id, user_id) primary key serves the filter)
+    (44, """
+        CREATE INDEX IF NOT EXISTS idx_grades_user_subj ON grades(user_id, subject_display, percentage, grade);
+        CREATE INDEX IF NOT EXISTS idx_grades_user_topic ON grades(user_id, topic, subject_display, percentage, grade);
+        CREATE INDEX IF NOT EXISTS idx_grades_user_cmd ON grades(user_id, command_term, percentage);
+    """),
+
+    # Migration 45: Per-student progress aggregates (COUNT/AVG(percentage)/
+    # MAX(timestamp)) served from the index; supersedes idx_grades_user_timestamp
+    (45, """
+        CREATE INDEX IF NOT EXISTS idx_grades_user_ts_pct ON grades(user_id, timestamp, percentage);
+        DROP INDEX IF EXISTS idx_grades_user_timestamp;
+    """),
+
+    # Migration 46: Covering milestone index matching _load_milestones'
+    # filter/order/column list; filter indexes for assignment and challenge lists
+    (46, """
+        CREATE INDEX IF NOT EXISTS idx_milestones_cover ON milestones(
+            user_id, parent_type, parent_subject, sort_order,
+            id, title, due_date, completed, completed_date, notes
+        );
+        CREATE INDEX IF NOT EXISTS idx_assignments_class ON assignments(class_id, due_date);
+        CREATE INDEX IF NOT EXISTS idx_challenges_group ON challenges(group_id, created_at);
+    """),
+    (47, """
+        CREATE INDEX IF NOT EXISTS idx_cas_user_strand ON cas_reflections(user_id, strand, hours);
+    """),
+    (48, """
+        CREATE INDEX IF NOT EXISTS idx_milestones_next ON milestones(user_id, parent_type, sort_order)
+            WHERE completed = 0;
+    """),
+    (49, """
+        CREATE INDEX IF NOT EXISTS idx_group_members_role ON group_members(group_id, role, user_id);
+    """),
+    (50, """
+        CREATE TABLE IF NOT EXISTS leaderboard_rankings (
+            scope TEXT NOT NULL,
+            scope_id INTEGER NOT NULL DEFAULT 0,
+            rank INTEGER NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            xp INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(scope, scope_id, rank)
+        ) WITHOUT ROWID;
+    """),
+    (51, """
+        CREATE INDEX IF NOT EXISTS idx_gamification_xp ON gamification(total_xp DESC, user_id);
+        CREATE INDEX IF NOT EXISTS idx_classes_school ON classes(school_id, id);
+    """),
+    (52, """
+        CREATE TABLE IF NOT EXISTS study_buddy_subjects (
+            subject TEXT NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            PRIMARY KEY(subject, user_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_buddy_subjects_user ON study_buddy_subjects(user_id, subject);
+    """),
+
+    # Migration 53: Rebuild the composite-keyed lookup tables as WITHOUT ROWID
+    # so the primary key B-tree holds the row (one descent per get/upsert)
+    (53, """
+        BEGIN;
+        CREATE TABLE student_ability_new (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            subject TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            theta REAL NOT NULL DEFAULT 0.0,
+            uncertainty REAL NOT NULL DEFAULT 1.0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_updated TEXT NOT NULL DEFAULT '',
+            mastery_state TEXT NOT NULL DEFAULT 'unknown',
+            last_correct_ratio REAL DEFAULT 0.0,
+            PRIMARY KEY(user_id, subject, topic)
+        ) WITHOUT ROWID;
+        INSERT INTO student_ability_new (user_id, subject, topic, theta, uncertainty,
+                attempts, last_updated, mastery_state, last_correct_ratio)
+            SELECT user_id, subject, topic, theta, uncertainty,
+                attempts, last_updated, mastery_state, last_correct_ratio
+            FROM student_ability;
+        DROP TABLE student_ability;
+        ALTER TABLE student_ability_new RENAME TO student_ability;
+
+        CREATE TABLE paper_ratings_new (
+            paper_id INTEGER NOT NULL REFERENCES community_papers(id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            rating INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY(paper_id, user_id)
+        ) WITHOUT ROWID;
+        INSERT INTO paper_ratings_new (paper_id, user_id, rating, created_at)
+            SELECT paper_id, user_id, rating, created_at FROM paper_ratings;
+        DROP TABLE paper_ratings;
+        ALTER TABLE paper_ratings_new RENAME TO paper_ratings;
+        COMMIT;
+    """),
+
+    # Migration 54: Trigger-maintained rating totals on community_papers so
+    # listings read avg_rating without joining and grouping paper_ratings
+    (54, """
+        ALTER TABLE community_papers ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE community_papers ADD COLUMN rating_count INTEGER NOT NULL DEFAULT 0;
+        UPDATE community_papers SET
+            rating_sum = COALESCE((SELECT SUM(rating) FROM paper_ratings WHERE paper_id = community_papers.id), 0),
+            rating_count = (SELECT COUNT(*) FROM paper_ratings WHERE paper_id = community_papers.id);
+
+        CREATE TRIGGER IF NOT EXISTS trg_paper_ratings_insert
+        AFTER INSERT ON paper_ratings
+        BEGIN
+            UPDATE community_papers
+                SET rating_sum = rating_sum + NEW.rating, rating_count = rating_count + 1
+                WHERE id = NEW.paper_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_paper_ratings_update
+        AFTER UPDATE OF rating ON paper_ratings
+        BEGIN
+            UPDATE community_papers SET rating_sum = rating_sum + NEW.rating - OLD.rating
+                WHERE id = NEW.paper_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_paper_ratings_delete
+        AFTER DELETE ON paper_ratings
+        BEGIN
+            UPDATE community_papers
+                SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+                WHERE id = OLD.paper_id;
+        END;
+    """),
+
+    # Migration 55: Per-user history listings read newest-first from an index;
+    # the tutor one covers list_conversations' columns
+    (55, """
+        CREATE INDEX IF NOT EXISTS idx_tutor_user_updated ON tutor_conversations(
+            user_id, updated_at DESC, id, subject, topic, created_at
+        );
+        CREATE INDEX IF NOT EXISTS idx_exam_sessions_user_started ON exam_sessions(user_id, started_at DESC);
+    """),
+
+    # Migration 56: Examiner review listings — a student's reviews newest-first,
+    # and the open queue oldest-first (partial, so it stays small)
+    (56, """
+        CREATE INDEX IF NOT EXISTS idx_examiner_reviews_user_submitted
+            ON examiner_reviews(user_id, submitted_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_examiner_reviews_queue
+            ON examiner_reviews(submitted_at) WHERE status IN ('submitted', 'assigned');
+    """),
+
+    # Migration 57: Per-user grade history; the rowid (id) rides along, so
+    # ORDER BY id [DESC] LIMIT reads only that user's newest entries
+    (57, """
+        CREATE INDEX IF NOT EXISTS idx_grade_history_user ON grade_history(user_id);
+    """),
 ]
 
 
+def _json_list(raw) -> list:
+    """Decode a JSON array column, treating bad or non-list values as empty."""
+    try:
+        value = json.loads(raw or "[]")
+    except (TypeError, ValueError):
+        return []
+    return value if isinstance(value, list) else []
+
+
+def _backfill_user_badges(db) -> None:
+    """Copy badges from the legacy gamification.badges JSON blob."""
+    rows = db.execute("SELECT user_id, badges FROM gamification").fetchall()
+    db.executemany(
+        "INSERT OR IGNORE INTO user_badges (user_id, badge_id, awarded_at) VALUES (?, ?, '')",
+        [(r["user_id"], str(b)) for r in rows for b in _json_list(r["badges"])],
+    )
+
+
+def _backfill_study_buddy_subjects(db) -> None:
+    """Copy subjects from the study_buddy_preferences.subjects JSON column."""
+    rows = db.execute("SELECT user_id, subjects FROM study_buddy_preferences").fetchall()
+    db.executemany(
+        "INSERT OR IGNORE INTO study_buddy_subjects (subject, user_id) VALUES (?, ?)",
+        list({(str(s), r["user_id"]) for r in rows for s in _json_list(r["subjects"])}),
+    )
+
+
+# Data backfills run in Python after a migration's DDL, so they behave the same
+# on SQLite and PostgreSQL (no json_each there). Must be idempotent.
+MIGRATION_BACKFILLS = {
+    41: [_backfill_user_badges],
+    52: [_backfill_study_buddy_subjects],
+}
+
+# Migrations using SQLite-only DDL (triggers, WITHOUT ROWID rebuilds). On
+# PostgreSQL they are recorded as applied but not executed; callers fall back
+# to live queries.
+SQLITE_ONLY_MIGRATIONS = {43, 53, 54}
+
+
 def _is_postgres() -> bool:
     """Check if the configured database is PostgreSQL."""
     from pg_compat import is_postgres_url
@@ -1017,30 +1293,74 @@ def get_db():
     Supports both SQLite (default) and PostgreSQL (when DATABASE starts
     with postgresql:// or postgres://).
     """
-    if "db" not in g:
-        db_url = current_app.config.get("DATABASE", str(Path(__file__).parent / "ib_study.db"))
+    # Fast path: one lookup on g for the common already-connected case
+    db = g.get("db")
+    if db is not None:
+        return db
+
+    db_url = _database_url()
 
+    try:
+        from pg_compat import connect_pg, is_postgres_url
+        if is_postgres_url(db_url):
+            g.db = connect_pg(db_url)
+            return g.db
+    except ImportError:
+        pass
+
+    # Default: SQLite, reusing an idle pooled connection when there is one
+    pool = _sqlite_pools.get((os.getpid(), db_url))
+    if pool is not None:
         try:
-            from pg_compat import is_postgres_url, connect_pg
-            if is_postgres_url(db_url):
-                g.db = connect_pg(db_url)
-                return g.db
-        except ImportError:
+            g.db = pool.get_nowait()
+            return g.db
+        except queue.Empty:
             pass
-
-        # Default: SQLite
-        g.db = sqlite3.connect(db_url)
-        g.db.row_factory = sqlite3.Row
-        g.db.execute("PRAGMA journal_mode=WAL")
-        g.db.execute("PRAGMA foreign_keys=ON")
+    g.db = _connect_sqlite(db_url)
     return g.db
 
 
+def _database_url() -> str:
+    return current_app.config.get("DATABASE", str(Path(__file__).parent / "ib_study.db"))
+
+
+def _connect_sqlite(path: str) -> sqlite3.Connection:
+    # check_same_thread=False: pooled connections move between worker
+    # threads, but only ever serve one request at a time
+    db = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    for pragma in SQLITE_PRAGMAS:
+        db.execute(pragma)
+    return db
+
+
 def close_db(e=None) -> None:
-    """Teardown handler — close DB connection."""
+    """Teardown handler — return the DB connection to the pool, or close it."""
     db = g.pop("db", None)
-    if db is not None:
-        db.close()
+    if db is None:
+        return
+    if isinstance(db, sqlite3.Connection):
+        # Refresh planner statistics for tables this connection queried;
+        # analysis_limit bounds the work so teardown never stalls.
+        try:
+            if db.in_transaction:
+                db.rollback()  # uncommitted work is discarded, as on close
+            db.execute("PRAGMA analysis_limit=400")
+            db.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            db.close()
+            return
+        size = current_app.config.get("SQLITE_POOL_SIZE", 0)
+        if size:
+            pool = _sqlite_pools.setdefault(
+                (os.getpid(), _database_url()), queue.LifoQueue(maxsize=size),
+            )
+            try:
+                pool.put_nowait(db)
+                return
+            except queue.Full:
+                pass
+    db.close()
 
 
 def init_db() -> None:
@@ -1056,7 +1376,7 @@ def run_migrations() -> None:
     Uses file-based locking to prevent race conditions when multiple
     Gunicorn workers start simultaneously.
     """
-    db_url = current_app.config.get("DATABASE", str(Path(__file__).parent / "ib_study.db"))
+    db_url = _database_url()
     lock_file = None
 
     # File-based locking only for SQLite (PostgreSQL has its own locking)
@@ -1081,19 +1401,33 @@ def run_migrations() -> None:
             row["version"]
             for row in db.execute("SELECT version FROM schema_version").fetchall()
         }
+        changed = False
         for version, sql in MIGRATIONS:
             if version not in applied:
+                if use_pg and version in SQLITE_ONLY_MIGRATIONS:
+                    sql = ""
                 try:
                     db.executescript(sql)
                 except (sqlite3.OperationalError, Exception) as e:
                     err_msg = str(e).lower()
                     if "duplicate column" not in err_msg and "already exists" not in err_msg:
                         raise
+                for backfill in MIGRATION_BACKFILLS.get(version, ()):
+                    backfill(db)
                 db.execute(
                     "INSERT INTO schema_version (version, applied_at) VALUES (?, ?)",
                     (version, datetime.now().isoformat()),
                 )
                 db.commit()
+                changed = True
+        if not use_pg and (changed or not db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone()):
+            # Give the planner real statistics after schema changes instead of
+            # its built-in row-count guesses; close_db keeps them fresh.
+            db.execute("PRAGMA analysis_limit=400")
+            db.execute("ANALYZE")
+            db.commit()
     finally:
         if lock_file:
             if fcntl:
@@ -7,44 +7,223 @@ and lifecycle.py, but reads/writes from SQLite instead of flat JSON files.
 
 from __future__ import annotations
 
+import atexit
 import json
+import logging
 import math
+import os
 import secrets
-from dataclasses import dataclass, field, asdict
-from datetime import datetime, date, timedelta
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
 from typing import Optional
 
-from database import get_db
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from database import _is_postgres, get_db
+
+logger = logging.getLogger(__name__)
 
 # Re-export dataclasses used by app.py (unchanged from profile.py)
 from profile import (
-    SubjectEntry,
-    GradeDetailEntry,
+    BADGE_DEFINITIONS,
+    MISCONCEPTION_PATTERNS,
+    XP_AWARDS,
     ActivityEntry,
-    ReviewItem,
-    StudyTask,
     DailyPlan,
     Flashcard,
+    GradeDetailEntry,
     MisconceptionEntry,
     MockExamReport,
     Notification,
+    ReviewItem,
     SharedQuestionSet,
+    StudyTask,
+    SubjectEntry,
     TopicAttempt,
     TopicProgress,
-    MISCONCEPTION_PATTERNS,
-    BADGE_DEFINITIONS,
-    XP_AWARDS,
 )
+
 from lifecycle import (
-    Milestone,
+    CAS_LEARNING_OUTCOMES,
+    CASReflection,
     ExtendedEssay,
     InternalAssessment,
-    CASReflection,
+    Milestone,
     TOKProgress,
-    CAS_LEARNING_OUTCOMES,
+    ia_milestones,
 )
 
 
+def _new_id(prefix: str) -> str:
+    """Return a time-sortable unique id, e.g. ``fc_0192b3c4d5e6a1b2c3d4e5``.
+
+    ULID-style: 48-bit millisecond timestamp followed by 40 random bits,
+    hex-encoded, from one clock read and one urandom call.
+    """
+    return f"{prefix}_{time.time_ns() // 1_000_000:012x}{os.urandom(5).hex()}"
+
+
+def _loads(text):
+    """Decode a stored JSON column, with orjson when it is installed.
+
+    Falls back to the stdlib for what orjson rejects but ``json.dumps``
+    may have written (NaN/Infinity).
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def _rows_to_dicts(rows) -> list[dict]:
+    """Convert rows to dicts, reading the column names only once.
+
+    Accepts fetched rows or an executed cursor; a cursor is read directly,
+    without an intermediate fetchall() list.
+    """
+    if hasattr(rows, "description"):
+        keys = [d[0] for d in rows.description or ()]
+    elif rows:
+        keys = rows[0].keys()
+    else:
+        return []
+    return [dict(zip(keys, r)) for r in rows]
+
+
+def _cached(key: str, ttl: int, compute):
+    """Return ``compute()`` through the shared cache backend.
+
+    Best effort: if the backend is unavailable the value is computed directly.
+    """
+    try:
+        from cache_backend import get_cache
+        cache = get_cache()
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+    except Exception:
+        return compute()
+    value = compute()
+    try:
+        cache.set(key, value, ttl=ttl)
+    except Exception:
+        pass
+    return value
+
+
+def _cache_version(name: str) -> int:
+    """Current version of a cached family; part of its keys."""
+    try:
+        from cache_backend import get_cache
+        return get_cache().get(f"{name}:version") or 0
+    except Exception:
+        return 0
+
+
+def _bump_cache_version(name: str) -> None:
+    """Invalidate every cached entry of a family by moving its version on."""
+    try:
+        from cache_backend import get_cache
+        get_cache().set(f"{name}:version", time.time_ns(), ttl=86400)
+    except Exception:
+        pass
+
+
+def _tuple_cursor(db):
+    """Cursor yielding plain tuples, for bulk reads indexed by position.
+
+    Skips the per-column name lookup of sqlite3.Row on large result sets;
+    single-row fetches should keep using ``db.execute``.
+    """
+    cur = db.cursor()
+    cur.row_factory = None
+    return cur
+
+
+class _CounterBuffer:
+    """Coalesce ``+1`` bumps of one counter column into periodic batch UPDATEs.
+
+    Increments accumulate per row id and a timer flushes them as a single
+    ``executemany`` once ``COUNTER_FLUSH_INTERVAL`` seconds have passed. With
+    the interval unset or 0 (tests, serverless) every bump is written through.
+    A failed flush keeps its increments pending for the next attempt, and
+    whatever is still pending is flushed at interpreter exit.
+    """
+
+    def __init__(self, table: str, column: str):
+        self._sql = f"UPDATE {table} SET {column} = {column} + ? WHERE id = ?"
+        self._lock = threading.Lock()
+        self._pending: dict[int, int] = {}
+        self._timer: threading.Timer | None = None
+        self._app = None
+        self._interval = 0.0
+        atexit.register(self._flush_at_exit)
+
+    def add(self, row_id: int) -> None:
+        from flask import current_app
+        interval = current_app.config.get("COUNTER_FLUSH_INTERVAL", 0)
+        if not interval:
+            db = get_db()
+            db.execute(self._sql, (1, row_id))
+            db.commit()
+            return
+        with self._lock:
+            self._pending[row_id] = self._pending.get(row_id, 0) + 1
+            self._app = current_app._get_current_object()
+            self._interval = interval
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """Arm the flush timer if it is not already running (lock held)."""
+        if self._timer is None:
+            self._timer = threading.Timer(self._interval, self.flush, args=(self._app,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self, app) -> None:
+        """Write out every pending increment in one transaction."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            timer, self._timer = self._timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if not batch:
+            return
+        try:
+            with app.app_context():
+                db = get_db()
+                try:
+                    db.executemany(self._sql, [(n, row_id) for row_id, n in batch.items()])
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+        except Exception:
+            logger.exception("Counter flush failed; keeping %d rows pending", len(batch))
+            with self._lock:
+                for row_id, n in batch.items():
+                    self._pending[row_id] = self._pending.get(row_id, 0) + n
+                if self._interval:
+                    self._schedule()
+
+    def _flush_at_exit(self) -> None:
+        with self._lock:
+            self._interval = 0.0  # no retry timer while shutting down
+        if self._app is not None and self._pending:
+            self.flush(self._app)
+
+
+_paper_downloads = _CounterBuffer("community_papers", "download_count")
+
+
 # ── Student Profile ──────────────────────────────────────────────────
 
 
@@ -279,6 +458,19 @@ class GradeDetailLogDB:
         ).fetchall()
         return [self._row_to_entry(r) for r in rows]
 
+    def percentage_summary(self, recent: int = 8) -> tuple[int, float, list]:
+        """(count, average percentage, latest ``recent`` percentages oldest first)."""
+        cur = _tuple_cursor(get_db())
+        cur.execute(
+            "SELECT percentage, COUNT(*) OVER (), AVG(percentage) OVER () "
+            "FROM grades WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (self.user_id, recent),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return 0, 0.0, []
+        return rows[0][1], rows[0][2], [r[0] for r in reversed(rows)]
+
     def command_term_stats(self) -> dict:
         db = get_db()
         rows = db.execute(
@@ -669,8 +861,12 @@ class GamificationProfileDB:
 
     @property
     def badges(self) -> list[str]:
-        r = self._row()
-        return json.loads(r["badges"]) if r else []
+        db = get_db()
+        rows = db.execute(
+            "SELECT badge_id FROM user_badges WHERE user_id=? ORDER BY awarded_at, badge_id",
+            (self.user_id,),
+        ).fetchall()
+        return [row["badge_id"] for row in rows]
 
     @property
     def streak_freeze_available(self) -> int:
@@ -782,7 +978,7 @@ class GamificationProfileDB:
         r = self._row()
         if not r:
             return []
-        current_badges = json.loads(r["badges"])
+        current_badges = set(self.badges)
         new_badges = []
         checks = [
             ("first_question", r["total_questions_answered"] >= 1),
@@ -797,12 +993,14 @@ class GamificationProfileDB:
         ]
         for badge_id, condition in checks:
             if condition and badge_id not in current_badges:
-                current_badges.append(badge_id)
                 new_badges.append(badge_id)
         if new_badges:
             db = get_db()
-            db.execute("UPDATE gamification SET badges=? WHERE user_id=?",
-                        (json.dumps(current_badges), self.user_id))
+            now = datetime.now().isoformat()
+            db.executemany(
+                "INSERT OR IGNORE INTO user_badges (user_id, badge_id, awarded_at) VALUES (?, ?, ?)",
+                [(self.user_id, b, now) for b in new_badges],
+            )
             db.commit()
         return new_badges
 
@@ -871,7 +1069,7 @@ class FlashcardDeckDB:
 
     def add(self, card: Flashcard) -> None:
         if not card.id:
-            card.id = f"fc_{datetime.now().strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(4)}"
+            card.id = _new_id("fc")
         if not card.next_review:
             card.next_review = date.today().isoformat()
         if not card.created_at:
@@ -964,7 +1162,7 @@ class FlashcardDeckDB:
         if existing:
             return None
         card = Flashcard(
-            id=f"fc_auto_{datetime.now().strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(4)}",
+            id=_new_id("fc_auto"),
             front=question,
             back=model_answer or "Review this topic",
             subject=subject,
@@ -1134,11 +1332,18 @@ class NotificationStoreDB:
 
     def unread_count(self) -> int:
         db = get_db()
+        if _is_postgres():
+            row = db.execute(
+                "SELECT COUNT(*) as cnt FROM notifications WHERE user_id=? AND read=0 AND dismissed=0",
+                (self.user_id,),
+            ).fetchone()
+            return row["cnt"] if row else 0
+        # Maintained by the trg_notif_unread_* triggers (migration 43)
         row = db.execute(
-            "SELECT COUNT(*) as cnt FROM notifications WHERE user_id=? AND read=0 AND dismissed=0",
+            "SELECT value FROM counters WHERE user_id=? AND key='unread'",
             (self.user_id,),
         ).fetchone()
-        return row["cnt"] if row else 0
+        return row["value"] if row else 0
 
     def recent(self, n: int = 20) -> list[Notification]:
         db = get_db()
@@ -1148,6 +1353,16 @@ class NotificationStoreDB:
         ).fetchall()
         return [self._row_to_notif(r) for r in rows]
 
+    def types_today(self) -> set[str]:
+        """Notification types already created for this user today."""
+        db = get_db()
+        today = date.today().isoformat()
+        rows = db.execute(
+            "SELECT DISTINCT type FROM notifications WHERE user_id=? AND created_at LIKE ?",
+            (self.user_id, f"{today}%"),
+        ).fetchall()
+        return {r[0] for r in rows}
+
     def has_today(self, notif_type: str) -> bool:
         db = get_db()
         today = date.today().isoformat()
@@ -1207,7 +1422,7 @@ class SharedQuestionStoreDB:
     def export_set(self, title: str, description: str, subject: str,
                    topic: str, level: str, questions: list[dict], author: str) -> SharedQuestionSet:
         qset = SharedQuestionSet(
-            id=f"qs_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            id=_new_id("qs"),
             title=title, description=description, author=author,
             subject=subject, topic=topic, level=level, questions=questions,
         )
@@ -1242,12 +1457,15 @@ class SharedQuestionStoreDB:
         row = db.execute("SELECT * FROM shared_questions WHERE id=?", (set_id,)).fetchone()
         if not row:
             return ""
-        return json.dumps({
+        # questions is stored as serialized JSON — splice it in verbatim
+        # rather than decoding and re-encoding a potentially large array.
+        head = json.dumps({
             "id": row["id"], "title": row["title"], "description": row["description"],
             "author": row["author"], "subject": row["subject"], "topic": row["topic"],
-            "level": row["level"], "questions": json.loads(row["questions"]),
-            "created_at": row["created_at"], "import_count": row["import_count"],
-        }, indent=2)
+            "level": row["level"], "created_at": row["created_at"],
+            "import_count": row["import_count"],
+        })
+        return f'{head[:-1]}, "questions": {row["questions"]}}}'
 
 
 # ── Study Plan ───────────────────────────────────────────────────────
@@ -1303,14 +1521,27 @@ class StudyPlanDB:
 
     def update_task(self, day_date: str, task_index: int) -> Optional[bool]:
         """Toggle a task's completed status. Returns new status or None if not found."""
-        plan_data = self.load()
-        if not plan_data:
+        db = get_db()
+        row = db.execute(
+            "SELECT id, daily_plans FROM study_plans WHERE user_id=? ORDER BY id DESC LIMIT 1",
+            (self.user_id,),
+        ).fetchone()
+        if not row:
             return None
-        for dp in plan_data["daily_plans"]:
-            if dp.date == day_date and 0 <= task_index < len(dp.tasks):
-                dp.tasks[task_index].completed = not dp.tasks[task_index].completed
-                self.save(plan_data["generated_date"], plan_data["exam_date"], plan_data["daily_plans"])
-                return dp.tasks[task_index].completed
+        plans_data = json.loads(row["daily_plans"])
+        for dp_data in plans_data:
+            tasks = dp_data.get("tasks", [])
+            if dp_data["date"] == day_date and 0 <= task_index < len(tasks):
+                new_state = not tasks[task_index].get("completed", False)
+                tasks[task_index]["completed"] = new_state
+                # Rewrite only this plan's JSON column in place rather than
+                # round-tripping through save()'s DELETE + INSERT.
+                db.execute(
+                    "UPDATE study_plans SET daily_plans=? WHERE id=?",
+                    (json.dumps(plans_data), row["id"]),
+                )
+                db.commit()
+                return new_state
         return None
 
 
@@ -1430,11 +1661,12 @@ class ParentConfigDB:
 
     def generate_token(self) -> str:
         token = secrets.token_hex(16)
-        expires = (datetime.now() + timedelta(days=90)).isoformat()
+        now = datetime.now()
+        expires = (now + timedelta(days=90)).isoformat()
         db = get_db()
         db.execute(
             "UPDATE parent_config SET token=?, created_at=?, token_expires_at=? WHERE user_id=?",
-            (token, datetime.now().isoformat(), expires, self.user_id),
+            (token, now.isoformat(), expires, self.user_id),
         )
         db.commit()
         return token
@@ -1510,7 +1742,7 @@ class UploadStoreDB:
             "SELECT * FROM uploads WHERE user_id=? ORDER BY uploaded_at",
             (self.user_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     def add(self, entry: dict) -> None:
         db = get_db()
@@ -1535,6 +1767,17 @@ class UploadStoreDB:
 
 # ── IB Lifecycle ─────────────────────────────────────────────────────
 
+# Per-strand CAS hours pivoted into one row, plus the reflection count.
+# Served entirely from idx_cas_user_strand.
+_CAS_TOTALS_SQL = (
+    "SELECT "
+    "COALESCE(SUM(CASE WHEN strand='Creativity' THEN hours END), 0.0), "
+    "COALESCE(SUM(CASE WHEN strand='Activity' THEN hours END), 0.0), "
+    "COALESCE(SUM(CASE WHEN strand='Service' THEN hours END), 0.0), "
+    "COUNT(*) "
+    "FROM cas_reflections WHERE user_id=?"
+)
+
 
 class IBLifecycleDB:
     """DB-backed IBLifecycle managing EE, IA, TOK, CAS."""
@@ -1563,17 +1806,29 @@ class IBLifecycleDB:
     def internal_assessments(self) -> list[InternalAssessment]:
         db = get_db()
         rows = db.execute(
-            "SELECT * FROM internal_assessments WHERE user_id=? ORDER BY id",
+            "SELECT ia.id AS ia_id, ia.subject, ia.title AS ia_title, ia.word_count, "
+            "m.id AS m_id, m.title AS m_title, m.due_date, m.completed, m.completed_date, m.notes "
+            "FROM internal_assessments ia "
+            "LEFT JOIN milestones m ON m.user_id = ia.user_id "
+            "AND m.parent_type = 'ia' AND m.parent_subject = ia.subject "
+            "WHERE ia.user_id=? ORDER BY ia.id, m.sort_order",
             (self.user_id,),
         ).fetchall()
-        result = []
+        by_id: dict[int, InternalAssessment] = {}
         for r in rows:
-            ia = InternalAssessment(
-                subject=r["subject"], title=r["title"], word_count=r["word_count"],
-                milestones=self._load_milestones("ia", r["subject"]),
-            )
-            result.append(ia)
-        return result
+            ia = by_id.get(r["ia_id"])
+            if ia is None:
+                ia = by_id[r["ia_id"]] = InternalAssessment(
+                    subject=r["subject"], title=r["ia_title"],
+                    word_count=r["word_count"], milestones=[],
+                )
+            if r["m_id"] is not None:
+                ia.milestones.append(Milestone(
+                    id=r["m_id"], title=r["m_title"], due_date=r["due_date"],
+                    completed=bool(r["completed"]), completed_date=r["completed_date"],
+                    notes=r["notes"],
+                ))
+        return list(by_id.values())
 
     # --- TOK ---
 
@@ -1608,22 +1863,16 @@ class IBLifecycleDB:
     @property
     def cas_hours(self) -> dict[str, float]:
         db = get_db()
-        rows = db.execute(
-            "SELECT strand, SUM(hours) as total FROM cas_reflections WHERE user_id=? GROUP BY strand",
-            (self.user_id,),
-        ).fetchall()
-        hours = {"Creativity": 0.0, "Activity": 0.0, "Service": 0.0}
-        for r in rows:
-            if r["strand"] in hours:
-                hours[r["strand"]] = r["total"] or 0.0
-        return hours
+        row = db.execute(_CAS_TOTALS_SQL, (self.user_id,)).fetchone()
+        return {"Creativity": row[0], "Activity": row[1], "Service": row[2]}
 
     # --- Milestone operations ---
 
     def _load_milestones(self, parent_type: str, parent_subject: str) -> list[Milestone]:
         db = get_db()
         rows = db.execute(
-            "SELECT * FROM milestones WHERE user_id=? AND parent_type=? AND parent_subject=? ORDER BY sort_order",
+            "SELECT id, title, due_date, completed, completed_date, notes FROM milestones "
+            "WHERE user_id=? AND parent_type=? AND parent_subject=? ORDER BY sort_order",
             (self.user_id, parent_type, parent_subject),
         ).fetchall()
         return [Milestone(
@@ -1632,29 +1881,34 @@ class IBLifecycleDB:
             notes=r["notes"],
         ) for r in rows]
 
-    def total_milestones(self) -> int:
-        db = get_db()
-        row = db.execute("SELECT COUNT(*) as cnt FROM milestones WHERE user_id=?", (self.user_id,)).fetchone()
-        return row["cnt"] if row else 0
-
-    def completed_milestones(self) -> int:
+    def milestone_counts(self) -> tuple[int, int]:
+        """Return (total, completed) milestone counts in one query."""
         db = get_db()
         row = db.execute(
-            "SELECT COUNT(*) as cnt FROM milestones WHERE user_id=? AND completed=1",
+            "SELECT COUNT(*) as total, COALESCE(SUM(completed), 0) as done "
+            "FROM milestones WHERE user_id=?",
             (self.user_id,),
         ).fetchone()
-        return row["cnt"] if row else 0
+        return (row["total"], row["done"]) if row else (0, 0)
+
+    def total_milestones(self) -> int:
+        return self.milestone_counts()[0]
+
+    def completed_milestones(self) -> int:
+        return self.milestone_counts()[1]
 
     def next_milestone(self, section: str = "all") -> Optional[Milestone]:
         db = get_db()
+        cols = "id, title, due_date, completed, completed_date, notes"
         if section == "all":
             row = db.execute(
-                "SELECT * FROM milestones WHERE user_id=? AND completed=0 ORDER BY sort_order LIMIT 1",
+                f"SELECT {cols} FROM milestones WHERE user_id=? AND completed=0 ORDER BY sort_order LIMIT 1",
                 (self.user_id,),
             ).fetchone()
         else:
             row = db.execute(
-                "SELECT * FROM milestones WHERE user_id=? AND parent_type=? AND completed=0 ORDER BY sort_order LIMIT 1",
+                f"SELECT {cols} FROM milestones WHERE user_id=? AND parent_type=? AND completed=0 "
+                "ORDER BY sort_order LIMIT 1",
                 (self.user_id, section),
             ).fetchone()
         if not row:
@@ -1665,24 +1919,20 @@ class IBLifecycleDB:
 
     def toggle_milestone(self, milestone_id: str) -> bool:
         db = get_db()
+        # SET expressions see the pre-update row, so the flip and its date
+        # are applied together in one statement.
         row = db.execute(
-            "SELECT completed FROM milestones WHERE user_id=? AND id=?",
-            (self.user_id, milestone_id),
+            "UPDATE milestones SET completed = 1 - completed, "
+            "completed_date = CASE WHEN completed = 0 THEN ? ELSE '' END "
+            "WHERE user_id=? AND id=? RETURNING completed",
+            (datetime.now().isoformat(), self.user_id, milestone_id),
         ).fetchone()
-        if not row:
-            return False
-        new_state = not bool(row["completed"])
-        completed_date = datetime.now().isoformat() if new_state else ""
-        db.execute(
-            "UPDATE milestones SET completed=?, completed_date=? WHERE user_id=? AND id=?",
-            (1 if new_state else 0, completed_date, self.user_id, milestone_id),
-        )
         db.commit()
-        return new_state
+        return bool(row["completed"]) if row else False
 
     def add_cas_reflection(self, reflection: CASReflection) -> None:
         if not reflection.id:
-            reflection.id = f"cas_{datetime.now().strftime('%Y%m%d%H%M%S')}_{secrets.token_hex(4)}"
+            reflection.id = _new_id("cas")
         db = get_db()
         db.execute(
             "INSERT INTO cas_reflections (id, user_id, strand, title, description, date, learning_outcome, hours) "
@@ -1693,33 +1943,42 @@ class IBLifecycleDB:
         db.commit()
 
     def get_ia_for_subject(self, subject: str) -> Optional[InternalAssessment]:
-        for ia in self.internal_assessments:
-            if ia.subject == subject:
-                return ia
-        return None
+        db = get_db()
+        row = db.execute(
+            "SELECT title, word_count FROM internal_assessments WHERE user_id=? AND subject=?",
+            (self.user_id, subject),
+        ).fetchone()
+        if not row:
+            return None
+        return InternalAssessment(
+            subject=subject, title=row["title"], word_count=row["word_count"],
+            milestones=self._load_milestones("ia", subject),
+        )
 
     def update_ee(self, **kwargs) -> None:
         db = get_db()
+        ee = self.extended_essay
         db.execute(
             "INSERT OR REPLACE INTO extended_essays (user_id, subject, research_question, supervisor, word_count) "
             "VALUES (?, ?, ?, ?, ?)",
             (self.user_id,
-             kwargs.get("subject", self.extended_essay.subject),
-             kwargs.get("research_question", self.extended_essay.research_question),
-             kwargs.get("supervisor", self.extended_essay.supervisor),
-             kwargs.get("word_count", self.extended_essay.word_count)),
+             kwargs.get("subject", ee.subject),
+             kwargs.get("research_question", ee.research_question),
+             kwargs.get("supervisor", ee.supervisor),
+             kwargs.get("word_count", ee.word_count)),
         )
         db.commit()
 
     def update_tok(self, **kwargs) -> None:
         db = get_db()
+        tok = self.tok
         db.execute(
             "INSERT OR REPLACE INTO tok_progress (user_id, essay_title, prescribed_title_number, exhibition_theme) "
             "VALUES (?, ?, ?, ?)",
             (self.user_id,
-             kwargs.get("essay_title", self.tok.essay_title),
-             kwargs.get("prescribed_title_number", self.tok.prescribed_title_number),
-             kwargs.get("exhibition_theme", self.tok.exhibition_theme)),
+             kwargs.get("essay_title", tok.essay_title),
+             kwargs.get("prescribed_title_number", tok.prescribed_title_number),
+             kwargs.get("exhibition_theme", tok.exhibition_theme)),
         )
         db.commit()
 
@@ -1744,79 +2003,112 @@ class IBLifecycleDB:
         # Ensure TOK row exists
         db.execute("INSERT OR IGNORE INTO tok_progress (user_id) VALUES (?)", (self.user_id,))
 
-        # Ensure EE milestones exist
-        ee_defaults = ExtendedEssay().milestones
-        for i, m in enumerate(ee_defaults):
-            db.execute(
-                "INSERT OR IGNORE INTO milestones (user_id, id, parent_type, parent_subject, title, sort_order) "
-                "VALUES (?, ?, 'ee', '', ?, ?)",
-                (self.user_id, m.id, m.title, i),
-            )
+        # Ensure EE and TOK milestones exist
+        milestone_rows = [
+            (self.user_id, m.id, "ee", "", m.title, i)
+            for i, m in enumerate(ExtendedEssay().milestones)
+        ]
+        milestone_rows += [
+            (self.user_id, m.id, "tok", "", m.title, i)
+            for i, m in enumerate(TOKProgress().milestones)
+        ]
 
-        # Ensure TOK milestones exist
-        tok_defaults = TOKProgress().milestones
-        for i, m in enumerate(tok_defaults):
-            db.execute(
-                "INSERT OR IGNORE INTO milestones (user_id, id, parent_type, parent_subject, title, sort_order) "
-                "VALUES (?, ?, 'tok', '', ?, ?)",
-                (self.user_id, m.id, m.title, i),
-            )
+        new_subjects = [
+            s for s in subjects if s not in core_subjects and s not in existing
+        ]
+        ia_rows = [(self.user_id, subject) for subject in new_subjects]
+        milestone_rows += [
+            (self.user_id, mid, "ia", subject, title, i)
+            for subject in new_subjects
+            for i, (mid, title) in enumerate(ia_milestones(subject))
+        ]
 
-        for subject in subjects:
-            if subject not in core_subjects and subject not in existing:
-                db.execute(
-                    "INSERT OR IGNORE INTO internal_assessments (user_id, subject) VALUES (?, ?)",
-                    (self.user_id, subject),
-                )
-                subj_key = subject.lower().split(":")[0].strip().replace(" ", "_").replace("&", "")
-                ia_milestones = [
-                    (f"ia_{subj_key}_topic", "Topic chosen"),
-                    (f"ia_{subj_key}_research", "Research complete"),
-                    (f"ia_{subj_key}_draft", "First draft"),
-                    (f"ia_{subj_key}_submit", "Submitted"),
-                ]
-                for i, (mid, title) in enumerate(ia_milestones):
-                    db.execute(
-                        "INSERT OR IGNORE INTO milestones (user_id, id, parent_type, parent_subject, title, sort_order) "
-                        "VALUES (?, ?, 'ia', ?, ?, ?)",
-                        (self.user_id, mid, subject, title, i),
-                    )
+        if ia_rows:
+            db.executemany(
+                "INSERT OR IGNORE INTO internal_assessments (user_id, subject) VALUES (?, ?)",
+                ia_rows,
+            )
+        db.executemany(
+            "INSERT OR IGNORE INTO milestones (user_id, id, parent_type, parent_subject, title, sort_order) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            milestone_rows,
+        )
         db.commit()
 
     def summary(self) -> dict:
-        total = self.total_milestones()
-        completed = self.completed_milestones()
-        ee = self.extended_essay
-        tok = self.tok
+        db = get_db()
+        # Per-section milestone counts and next open milestone in one pass
+        sections = {
+            (r["parent_type"], r["parent_subject"]): r
+            for r in db.execute(
+                "WITH ranked AS ("
+                "SELECT parent_type, parent_subject, completed, title, "
+                "ROW_NUMBER() OVER (PARTITION BY parent_type, parent_subject, completed "
+                "ORDER BY sort_order) as rn "
+                "FROM milestones WHERE user_id=?) "
+                "SELECT parent_type, parent_subject, COUNT(*) as total, "
+                "SUM(CASE WHEN completed=1 THEN 1 ELSE 0 END) as done, "
+                "MAX(CASE WHEN completed=0 AND rn=1 THEN title END) as next_title "
+                "FROM ranked GROUP BY parent_type, parent_subject",
+                (self.user_id,),
+            ).fetchall()
+        }
+        head = db.execute(
+            "SELECT e.user_id as has_ee, e.subject as ee_subject, e.research_question, "
+            "t.user_id as has_tok, t.essay_title "
+            "FROM users u "
+            "LEFT JOIN extended_essays e ON e.user_id = u.id "
+            "LEFT JOIN tok_progress t ON t.user_id = u.id "
+            "WHERE u.id=?",
+            (self.user_id,),
+        ).fetchone()
+        ia_rows = db.execute(
+            "SELECT subject, title FROM internal_assessments WHERE user_id=? ORDER BY id",
+            (self.user_id,),
+        ).fetchall()
+        cas = db.execute(_CAS_TOTALS_SQL, (self.user_id,)).fetchone()
+        cas_hours = {"Creativity": cas[0], "Activity": cas[1], "Service": cas[2]}
+        cas_count = cas[3]
 
-        def _section_progress(milestones):
-            t = len(milestones)
-            c = sum(1 for m in milestones if m.completed)
-            next_m = next((m for m in milestones if not m.completed), None)
+        def _progress(total, done, next_title):
             return {
-                "total": t, "completed": c,
-                "pct": round(c / t * 100) if t > 0 else 0,
-                "next": next_m.title if next_m else "All complete",
+                "total": total, "completed": done,
+                "pct": round(done / total * 100) if total > 0 else 0,
+                "next": next_title or "All complete",
             }
 
-        ias = self.internal_assessments
+        def _section_progress(parent_type, parent_subject=""):
+            r = sections.get((parent_type, parent_subject))
+            if r is None:
+                return _progress(0, 0, None)
+            return _progress(r["total"], r["done"] or 0, r["next_title"])
+
+        def _default_progress(milestones):
+            return _progress(len(milestones), 0, milestones[0].title if milestones else None)
+
+        total = sum(r["total"] for r in sections.values())
+        completed = sum(r["done"] or 0 for r in sections.values())
+        has_ee = head is not None and head["has_ee"] is not None
+        has_tok = head is not None and head["has_tok"] is not None
         return {
             "total_milestones": total,
             "completed_milestones": completed,
             "progress_pct": round(completed / total * 100) if total > 0 else 0,
-            "ee_subject": ee.subject,
-            "ee_rq": ee.research_question,
-            "ee_progress": _section_progress(ee.milestones),
-            "tok_title": tok.essay_title,
-            "tok_progress": _section_progress(tok.milestones),
-            "ia_count": len(ias),
+            "ee_subject": head["ee_subject"] if has_ee else "",
+            "ee_rq": head["research_question"] if has_ee else "",
+            "ee_progress": (_section_progress("ee") if has_ee
+                            else _default_progress(ExtendedEssay().milestones)),
+            "tok_title": head["essay_title"] if has_tok else "",
+            "tok_progress": (_section_progress("tok") if has_tok
+                             else _default_progress(TOKProgress().milestones)),
+            "ia_count": len(ia_rows),
             "ia_summaries": [
-                {"subject": ia.subject, "title": ia.title,
-                 "progress": _section_progress(ia.milestones)}
-                for ia in ias
+                {"subject": r["subject"], "title": r["title"],
+                 "progress": _section_progress("ia", r["subject"])}
+                for r in ia_rows
             ],
-            "cas_hours": self.cas_hours,
-            "cas_reflections_count": len(self.cas_reflections),
+            "cas_hours": cas_hours,
+            "cas_reflections_count": cas_count,
         }
 
     def save(self) -> None:
@@ -1834,23 +2126,49 @@ class GradeHistoryDB:
 
     @property
     def history(self) -> list[dict]:
+        cur = _tuple_cursor(get_db())
+        cur.execute(
+            "SELECT question, answer, mark_earned, mark_total, grade, percentage, "
+            "strengths, improvements, examiner_tip, full_commentary, model_answer, "
+            "raw_response, timestamp "
+            "FROM grade_history WHERE user_id=? ORDER BY id",
+            (self.user_id,),
+        )
+        return [{
+            "question": r[0], "answer": r[1],
+            "mark_earned": r[2], "mark_total": r[3],
+            "grade": r[4], "percentage": r[5],
+            "strengths": json.loads(r[6]),
+            "improvements": json.loads(r[7]),
+            "examiner_tip": r[8],
+            "full_commentary": r[9],
+            "model_answer": r[10],
+            "raw_response": r[11],
+            "timestamp": r[12],
+        } for r in cur.fetchall()]
+
+    def scores(self) -> list[dict]:
+        """Score-only view of history, oldest first.
+
+        Skips the JSON feedback lists and the large commentary/raw response
+        columns for callers that only chart grades over time.
+        """
         db = get_db()
         rows = db.execute(
-            "SELECT * FROM grade_history WHERE user_id=? ORDER BY id",
+            "SELECT question, grade, percentage, mark_earned, mark_total, timestamp "
+            "FROM grade_history WHERE user_id=? ORDER BY id",
             (self.user_id,),
         ).fetchall()
-        return [{
-            "question": r["question"], "answer": r["answer"],
-            "mark_earned": r["mark_earned"], "mark_total": r["mark_total"],
-            "grade": r["grade"], "percentage": r["percentage"],
-            "strengths": json.loads(r["strengths"]),
-            "improvements": json.loads(r["improvements"]),
-            "examiner_tip": r["examiner_tip"],
-            "full_commentary": r["full_commentary"],
-            "model_answer": r["model_answer"],
-            "raw_response": r["raw_response"],
-            "timestamp": r["timestamp"],
-        } for r in rows]
+        return _rows_to_dicts(rows)
+
+    def recent_improvements(self, limit: int = 20) -> list[list[str]]:
+        """Improvement notes of the latest ``limit`` grades, oldest first."""
+        cur = _tuple_cursor(get_db())
+        cur.execute(
+            "SELECT improvements FROM grade_history WHERE user_id=? ORDER BY id DESC LIMIT ?",
+            (self.user_id, limit),
+        )
+        return [json.loads(r[0]) for r in cur.fetchall()][::-1]
 
     def append(self, result) -> None:
         """Append a GradeResult to history."""
@@ -1934,20 +2252,18 @@ class ClassStoreDB:
             "WHERE c.teacher_id = ? GROUP BY c.id ORDER BY c.created_at DESC",
             (teacher_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def join(class_id: int, user_id: int) -> bool:
         db = get_db()
-        try:
-            db.execute(
-                "INSERT INTO class_members (class_id, user_id, joined_at) VALUES (?, ?, ?)",
-                (class_id, user_id, datetime.now().isoformat()),
-            )
-            db.commit()
-            return True
-        except db.IntegrityError:
-            return False
+        row = db.execute(
+            "INSERT OR IGNORE INTO class_members (class_id, user_id, joined_at) VALUES (?, ?, ?) "
+            "RETURNING class_id",
+            (class_id, user_id, datetime.now().isoformat()),
+        ).fetchone()
+        db.commit()
+        return row is not None
 
     @staticmethod
     def leave(class_id: int, user_id: int):
@@ -1963,7 +2279,7 @@ class ClassStoreDB:
             "JOIN users u ON cm.user_id = u.id WHERE cm.class_id = ? ORDER BY u.name",
             (class_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def student_classes(user_id: int) -> list[dict]:
@@ -1973,7 +2289,7 @@ class ClassStoreDB:
             "WHERE cm.user_id = ? ORDER BY c.name",
             (user_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def class_avg_grades(class_id: int) -> dict:
@@ -1984,14 +2300,14 @@ class ClassStoreDB:
             "FROM grades g JOIN class_members cm ON g.user_id = cm.user_id "
             "WHERE cm.class_id = ? GROUP BY g.subject_display",
             (class_id,),
-        ).fetchall()
+        )
         return {r["subject_display"]: {"avg_pct": round(r["avg_pct"], 1), "count": r["cnt"]} for r in rows}
 
     @staticmethod
     def student_progress(class_id: int) -> list[dict]:
         """Get per-student progress summary for a class."""
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT u.id, u.name, "
             "COUNT(g.id) as total_grades, "
             "COALESCE(AVG(g.percentage), 0) as avg_pct, "
@@ -2001,14 +2317,14 @@ class ClassStoreDB:
             "LEFT JOIN grades g ON g.user_id = u.id "
             "WHERE cm.class_id = ? GROUP BY u.id ORDER BY u.name",
             (class_id,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return _rows_to_dicts(cur)
 
     @staticmethod
     def topic_gaps(class_id: int) -> list[dict]:
         """Find topics where the class average is lowest — reveals syllabus gaps."""
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT g.topic, g.subject_display, "
             "AVG(g.percentage) as avg_pct, COUNT(*) as attempts, "
             "AVG(g.grade) as avg_grade "
@@ -2018,15 +2334,23 @@ class ClassStoreDB:
             "HAVING attempts >= 2 "
             "ORDER BY avg_pct ASC LIMIT 20",
             (class_id,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return _rows_to_dicts(cur)
 
     @staticmethod
     def at_risk_students(class_id: int, pct_threshold: float = 45.0, inactive_days: int = 7) -> list[dict]:
         """Flag students who are at risk: low average OR inactive for N days."""
         db = get_db()
         cutoff = (datetime.now() - timedelta(days=inactive_days)).isoformat()
+        # Risk reasons are computed in SQL as a bitmask:
+        # 1 = low average, 2 = inactive, 4 = no graded work at all
         rows = db.execute(
+            "SELECT id, name, total_grades, avg_pct, last_active, "
+            "ROUND(avg_pct, 1) as avg_pct_rounded, "
+            "(CASE WHEN avg_pct < ? AND total_grades > 0 THEN 1 ELSE 0 END"
+            " | CASE WHEN last_active IS NULL OR last_active < ? THEN 2 ELSE 0 END"
+            " | CASE WHEN total_grades = 0 THEN 4 ELSE 0 END) as risk_mask "
+            "FROM ("
             "SELECT u.id, u.name, "
             "COUNT(g.id) as total_grades, "
             "COALESCE(AVG(g.percentage), 0) as avg_pct, "
@@ -2035,21 +2359,27 @@ class ClassStoreDB:
             "JOIN users u ON cm.user_id = u.id "
             "LEFT JOIN grades g ON g.user_id = u.id "
             "WHERE cm.class_id = ? "
-            "GROUP BY u.id "
-            "HAVING avg_pct < ? OR last_active < ? OR last_active IS NULL "
+            "GROUP BY u.id, u.name"
+            ") s WHERE avg_pct < ? OR last_active < ? OR last_active IS NULL "
             "ORDER BY avg_pct ASC",
-            (class_id, pct_threshold, cutoff),
+            (pct_threshold, cutoff, class_id, pct_threshold, cutoff),
         ).fetchall()
+        inactive_reason = f"Inactive {inactive_days}+ days"
         result = []
         for r in rows:
+            mask = r["risk_mask"]
             reasons = []
-            if r["avg_pct"] < pct_threshold and r["total_grades"] > 0:
-                reasons.append(f"Low average ({round(r['avg_pct'], 1)}%)")
-            if r["last_active"] is None or r["last_active"] < cutoff:
-                reasons.append(f"Inactive {inactive_days}+ days")
-            if r["total_grades"] == 0:
+            if mask & 1:
+                reasons.append(f"Low average ({r['avg_pct_rounded']}%)")
+            if mask & 2:
+                reasons.append(inactive_reason)
+            if mask & 4:
                 reasons.append("No activity")
-            result.append({**dict(r), "risk_reasons": reasons})
+            result.append({
+                "id": r["id"], "name": r["name"], "total_grades": r["total_grades"],
+                "avg_pct": r["avg_pct"], "last_active": r["last_active"],
+                "risk_reasons": reasons,
+            })
         return result
 
     @staticmethod
@@ -2059,38 +2389,55 @@ class ClassStoreDB:
         Includes per-student summary rows with predicted grades, target grades,
         gaps, questions attempted, average percentage, and last active date.
         """
+        return "".join(ClassStoreDB.iter_class_csv(class_id))
+
+    @staticmethod
+    def iter_class_csv(class_id: int) -> Iterator[str]:
+        """Yield the export_class_csv output one CSV line at a time.
+
+        Member rows are read straight off the cursor, so a large class is
+        never held in memory as a whole and can be streamed to the client.
+        """
         import csv
         import io
         db = get_db()
         cls = db.execute("SELECT name, subject FROM classes WHERE id = ?", (class_id,)).fetchone()
-
-        # Get member list with targets
-        members = db.execute(
-            "SELECT u.id as user_id, u.name as student_name, "
-            "us.name as subject, us.target_grade "
-            "FROM class_members cm "
-            "JOIN users u ON cm.user_id = u.id "
-            "LEFT JOIN user_subjects us ON u.id = us.user_id "
-            "WHERE cm.class_id = ? "
-            "ORDER BY u.name",
-            (class_id,),
-        ).fetchall()
+        class_subject = cls["subject"] if cls else ""
 
         # Build per-student, per-subject summary
         from predictive_analytics import PredictiveGradeModel
         model = PredictiveGradeModel()
 
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow([
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+
+        def _line(row: list) -> str:
+            writer.writerow(row)
+            line = buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            return line
+
+        yield _line([
             "Student", "Subject", "Predicted Grade", "Target Grade", "Gap",
             "Questions Attempted", "Avg Percentage", "Last Active",
         ])
 
+        # Member list with targets: (user_id, student_name, subject, target_grade)
+        members = _tuple_cursor(db)
+        members.execute(
+            "SELECT u.id, u.name, us.name, us.target_grade "
+            "FROM class_members cm "
+            "JOIN users u ON cm.user_id = u.id "
+            "LEFT JOIN user_subjects us ON u.id = us.user_id "
+            "WHERE cm.class_id = ? "
+            "ORDER BY u.name",
+            (class_id,),
+        )
+
         seen = set()
-        for m in members:
-            uid = m["user_id"]
-            subj = m["subject"] or (cls["subject"] if cls else "")
+        for uid, student_name, member_subject, target_grade in members:
+            subj = member_subject or class_subject
             key = (uid, subj)
             if key in seen or not subj:
                 continue
@@ -2100,7 +2447,7 @@ class ClassStoreDB:
             pred = model.predict_subject_grade(uid, subj)
             predicted_grade = pred["predicted_grade"] if pred else ""
 
-            target = m["target_grade"] or ""
+            target = target_grade or ""
             gap = ""
             if pred and target:
                 gap = round(target - pred["predicted_grade"], 1)
@@ -2112,35 +2459,33 @@ class ClassStoreDB:
                 (uid, subj),
             ).fetchone()
 
-            writer.writerow([
-                m["student_name"], subj, predicted_grade, target, gap,
+            yield _line([
+                student_name, subj, predicted_grade, target, gap,
                 stats["cnt"] if stats else 0,
                 round(stats["avg_pct"], 1) if stats and stats["avg_pct"] else 0,
                 stats["last_ts"] if stats and stats["last_ts"] else "",
             ])
 
-        return output.getvalue()
-
     @staticmethod
     def grade_distribution(class_id: int) -> list[dict]:
         """Histogram data: grade 1-7 counts per subject for students in a class."""
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT g.subject_display, g.grade, COUNT(*) as cnt "
             "FROM grades g JOIN class_members cm ON g.user_id = cm.user_id "
             "WHERE cm.class_id = ? "
             "GROUP BY g.subject_display, g.grade "
             "ORDER BY g.subject_display, g.grade",
             (class_id,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return _rows_to_dicts(cur)
 
     @staticmethod
     def activity_heatmap(class_id: int) -> list[dict]:
         """Weekly study activity per student for the last 30 days."""
-        db = get_db()
         cutoff = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-        rows = db.execute(
+        cur = _tuple_cursor(get_db())
+        cur.execute(
             "SELECT u.name, al.date, SUM(al.duration_minutes) as minutes "
             "FROM activity_log al "
             "JOIN class_members cm ON al.user_id = cm.user_id "
@@ -2149,22 +2494,22 @@ class ClassStoreDB:
             "GROUP BY u.name, al.date "
             "ORDER BY u.name, al.date",
             (class_id, cutoff),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return [{"name": r[0], "date": r[1], "minutes": r[2]} for r in cur.fetchall()]
 
     @staticmethod
     def command_term_breakdown(class_id: int) -> list[dict]:
         """Class-wide command term performance stats."""
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT g.command_term, AVG(g.percentage) as avg_pct, COUNT(*) as cnt "
             "FROM grades g JOIN class_members cm ON g.user_id = cm.user_id "
             "WHERE cm.class_id = ? AND g.command_term != '' "
             "GROUP BY g.command_term "
             "ORDER BY avg_pct ASC",
             (class_id,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return _rows_to_dicts(cur)
 
 
 class AssignmentStoreDB:
@@ -2190,7 +2535,7 @@ class AssignmentStoreDB:
             "WHERE a.class_id = ? GROUP BY a.id ORDER BY a.due_date DESC",
             (class_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def get(assignment_id: int) -> dict | None:
@@ -2220,7 +2565,7 @@ class AssignmentStoreDB:
             "JOIN users u ON s.user_id = u.id WHERE s.assignment_id = ? ORDER BY s.score DESC",
             (assignment_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def student_assignments(user_id: int) -> list[dict]:
@@ -2237,7 +2582,7 @@ class AssignmentStoreDB:
             "WHERE cm.user_id = ? ORDER BY a.due_date ASC",
             (user_id, user_id),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
 
 # ── Study Groups & Social ────────────────────────────────────────────
@@ -2250,16 +2595,17 @@ class StudyGroupStoreDB:
     def create(name: str, created_by: int, subject: str = "", level: str = "", max_members: int = 20) -> dict:
         import secrets
         invite_code = secrets.token_urlsafe(6)
+        now_iso = datetime.now().isoformat()
         db = get_db()
         cur = db.execute(
             "INSERT INTO study_groups (name, subject, level, created_by, invite_code, max_members, created_at) "
             "VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (name, subject, level, created_by, invite_code, max_members, datetime.now().isoformat()),
+            (name, subject, level, created_by, invite_code, max_members, now_iso),
         )
         group_id = cur.lastrowid
         db.execute(
             "INSERT INTO group_members (group_id, user_id, role, joined_at) VALUES (?, ?, 'owner', ?)",
-            (group_id, created_by, datetime.now().isoformat()),
+            (group_id, created_by, now_iso),
         )
         db.commit()
         return {"id": group_id, "invite_code": invite_code}
@@ -2279,22 +2625,16 @@ class StudyGroupStoreDB:
     @staticmethod
     def join(group_id: int, user_id: int) -> bool:
         db = get_db()
-        # Check max members
-        group = db.execute("SELECT max_members FROM study_groups WHERE id = ?", (group_id,)).fetchone()
-        if not group:
-            return False
-        count = db.execute("SELECT COUNT(*) as c FROM group_members WHERE group_id = ?", (group_id,)).fetchone()["c"]
-        if count >= group["max_members"]:
-            return False
-        try:
-            db.execute(
-                "INSERT INTO group_members (group_id, user_id, role, joined_at) VALUES (?, ?, 'member', ?)",
-                (group_id, user_id, datetime.now().isoformat()),
-            )
-            db.commit()
-            return True
-        except db.IntegrityError:
-            return False
+        # Only inserts while the group exists and is below max_members
+        row = db.execute(
+            "INSERT OR IGNORE INTO group_members (group_id, user_id, role, joined_at) "
+            "SELECT id, ?, 'member', ? FROM study_groups "
+            "WHERE id = ? AND (SELECT COUNT(*) FROM group_members WHERE group_id = ?) < max_members "
+            "RETURNING group_id",
+            (user_id, datetime.now().isoformat(), group_id, group_id),
+        ).fetchone()
+        db.commit()
+        return row is not None
 
     @staticmethod
     def leave(group_id: int, user_id: int):
@@ -2312,7 +2652,7 @@ class StudyGroupStoreDB:
             "WHERE gm.group_id = ? ORDER BY gm.role DESC, u.name",
             (group_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def user_groups(user_id: int) -> list[dict]:
@@ -2325,7 +2665,7 @@ class StudyGroupStoreDB:
             "GROUP BY sg.id ORDER BY sg.created_at DESC",
             (user_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
 
 class ChallengeStoreDB:
@@ -2357,7 +2697,7 @@ class ChallengeStoreDB:
     @staticmethod
     def group_challenges(group_id: int) -> list[dict]:
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT ch.*, u.name as challenger_name, "
             "COUNT(cp.user_id) as participant_count "
             "FROM challenges ch "
@@ -2365,8 +2705,8 @@ class ChallengeStoreDB:
             "LEFT JOIN challenge_participants cp ON ch.id = cp.challenge_id "
             "WHERE ch.group_id = ? GROUP BY ch.id ORDER BY ch.created_at DESC",
             (group_id,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return _rows_to_dicts(cur)
 
     @staticmethod
     def submit_score(challenge_id: int, user_id: int, score: float) -> bool:
@@ -2391,33 +2731,79 @@ class ChallengeStoreDB:
             "WHERE cp.challenge_id = ? ORDER BY cp.score DESC",
             (challenge_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
 
 class LeaderboardStoreDB:
-    """Global / group / school leaderboard."""
+    """Global / group / school leaderboard.
+
+    Rankings are materialized into leaderboard_rankings by refresh(), which
+    the scheduler runs every few minutes, so get() is a primary-key range
+    read. Scopes with no materialized rows are ranked live.
+    """
+
+    # (scope, scope_id, rank, user_id, xp) for every scope, ranked by XP
+    _RANKING_SQL = (
+        "SELECT 'global', 0, ROW_NUMBER() OVER (ORDER BY g.total_xp DESC, g.user_id), "
+        "g.user_id, g.total_xp "
+        "FROM gamification g JOIN users u ON g.user_id = u.id "
+        "UNION ALL "
+        "SELECT 'group', gm.group_id, "
+        "ROW_NUMBER() OVER (PARTITION BY gm.group_id ORDER BY g.total_xp DESC, g.user_id), "
+        "g.user_id, g.total_xp "
+        "FROM group_members gm JOIN gamification g ON g.user_id = gm.user_id "
+        "UNION ALL "
+        "SELECT 'school', s.school_id, "
+        "ROW_NUMBER() OVER (PARTITION BY s.school_id ORDER BY g.total_xp DESC, g.user_id), "
+        "g.user_id, g.total_xp "
+        "FROM (SELECT DISTINCT c.school_id, cm.user_id FROM class_members cm "
+        "JOIN classes c ON cm.class_id = c.id WHERE c.school_id IS NOT NULL) s "
+        "JOIN gamification g ON g.user_id = s.user_id"
+    )
+
+    @staticmethod
+    def refresh() -> None:
+        """Recompute every materialized ranking in one transaction."""
+        db = get_db()
+        db.execute("DELETE FROM leaderboard_rankings")
+        db.execute(
+            "INSERT INTO leaderboard_rankings (scope, scope_id, rank, user_id, xp) "
+            + LeaderboardStoreDB._RANKING_SQL
+        )
+        db.commit()
+        _bump_cache_version("leaderboard")
 
     @staticmethod
     def get(scope: str = "global", scope_id: int = 0, period: str = "all", limit: int = 50) -> list[dict]:
-        # Check cache first (5-minute TTL)
-        try:
-            from cache_backend import get_cache
-            cache = get_cache()
-            cache_key = f"leaderboard:{scope}:{scope_id}:{period}"
-            cached = cache.get(cache_key)
-            if cached is not None:
-                return cached[:limit]
-        except Exception:
-            cache = None
-            cache_key = None
+        if scope not in ("global", "group", "school"):
+            return []
+        key = f"leaderboard:{_cache_version('leaderboard')}:{scope}:{scope_id}:{limit}"
+        return _cached(key, 30, lambda: LeaderboardStoreDB._load(scope, scope_id, limit))
 
+    @staticmethod
+    def _load(scope: str, scope_id: int, limit: int) -> list[dict]:
+        db = get_db()
+        rows = db.execute(
+            "SELECT lr.user_id, u.name, lr.xp, lr.rank "
+            "FROM leaderboard_rankings lr JOIN users u ON lr.user_id = u.id "
+            "WHERE lr.scope = ? AND lr.scope_id = ? ORDER BY lr.rank LIMIT ?",
+            (scope, scope_id, limit),
+        ).fetchall()
+        if rows:
+            return _rows_to_dicts(rows)
+        # Not materialized yet (first boot, or a scope created since the
+        # last refresh); live ranking of an empty or new scope is cheap.
+        return LeaderboardStoreDB._rank_live(scope, scope_id, limit)
+
+    @staticmethod
+    def _rank_live(scope: str, scope_id: int, limit: int) -> list[dict]:
+        """Rank straight from gamification for scopes not yet materialized."""
         db = get_db()
-        # Real-time leaderboard from gamification table
         if scope == "global":
             rows = db.execute(
                 "SELECT u.id as user_id, u.name, g.total_xp as xp "
                 "FROM gamification g JOIN users u ON g.user_id = u.id "
-                "ORDER BY g.total_xp DESC LIMIT ?",
+                "ORDER BY g.total_xp DESC, g.user_id LIMIT ?",
                 (limit,),
             ).fetchall()
         elif scope == "group":
@@ -2426,35 +2812,21 @@ class LeaderboardStoreDB:
                 "FROM group_members gm "
                 "JOIN users u ON gm.user_id = u.id "
                 "JOIN gamification g ON g.user_id = u.id "
-                "WHERE gm.group_id = ? ORDER BY g.total_xp DESC LIMIT ?",
+                "WHERE gm.group_id = ? ORDER BY g.total_xp DESC, g.user_id LIMIT ?",
                 (scope_id, limit),
             ).fetchall()
-        elif scope == "school":
+        else:
             rows = db.execute(
                 "SELECT u.id as user_id, u.name, g.total_xp as xp "
                 "FROM class_members cm "
                 "JOIN classes c ON cm.class_id = c.id "
                 "JOIN users u ON cm.user_id = u.id "
                 "JOIN gamification g ON g.user_id = u.id "
-                "WHERE c.school_id = ? GROUP BY u.id ORDER BY g.total_xp DESC LIMIT ?",
+                "WHERE c.school_id = ? GROUP BY u.id, u.name, g.total_xp "
+                "ORDER BY g.total_xp DESC, g.user_id LIMIT ?",
                 (scope_id, limit),
             ).fetchall()
-        else:
-            rows = []
-        result = []
-        for i, r in enumerate(rows, 1):
-            entry = dict(r)
-            entry["rank"] = i
-            result.append(entry)
-
-        # Cache for 5 minutes
-        if cache_key:
-            try:
-                cache.set(cache_key, result, ttl=300)
-            except Exception:
-                pass
-
-        return result
+        return [dict(r, rank=i) for i, r in enumerate(rows, 1)]
 
 
 # ── Push Subscriptions ───────────────────────────────────────────────
@@ -2467,8 +2839,10 @@ class PushSubscriptionStoreDB:
     def subscribe(user_id: int, endpoint: str, p256dh: str, auth: str):
         db = get_db()
         db.execute(
-            "INSERT OR REPLACE INTO push_subscriptions (user_id, endpoint, p256dh, auth, created_at) "
-            "VALUES (?, ?, ?, ?, ?)",
+            "INSERT INTO push_subscriptions (user_id, endpoint, p256dh, auth, created_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(endpoint) DO UPDATE SET user_id = excluded.user_id, "
+            "p256dh = excluded.p256dh, auth = excluded.auth, created_at = excluded.created_at",
             (user_id, endpoint, p256dh, auth, datetime.now().isoformat()),
         )
         db.commit()
@@ -2485,7 +2859,7 @@ class PushSubscriptionStoreDB:
         rows = db.execute(
             "SELECT * FROM push_subscriptions WHERE user_id = ?", (user_id,)
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
 
 # ── Community Papers ─────────────────────────────────────────────────
@@ -2506,11 +2880,20 @@ class CommunityPaperStoreDB:
              json.dumps(questions or []), datetime.now().isoformat()),
         )
         db.commit()
+        _bump_cache_version("community_papers")
         return cur.lastrowid
 
     @staticmethod
     def list_papers(subject: str = "", level: str = "", approved_only: bool = True,
                     limit: int = 50, offset: int = 0) -> list[dict]:
+        key = (f"community_papers:{_cache_version('community_papers')}:"
+               f"{subject}:{level}:{int(approved_only)}:{limit}:{offset}")
+        return _cached(key, 30, lambda: CommunityPaperStoreDB._load_papers(
+            subject, level, approved_only, limit, offset))
+
+    @staticmethod
+    def _load_papers(subject: str, level: str, approved_only: bool,
+                     limit: int, offset: int) -> list[dict]:
         db = get_db()
         conditions = []
         params: list = []
@@ -2524,17 +2907,28 @@ class CommunityPaperStoreDB:
             params.append(level)
         where = "WHERE " + " AND ".join(conditions) if conditions else ""
         params.extend([limit, offset])
-        rows = db.execute(
+        if _is_postgres():
+            cur = db.execute(
+                f"SELECT cp.*, u.name as uploader_name, "
+                f"COALESCE(AVG(pr.rating), 0) as avg_rating, "
+                f"COUNT(DISTINCT pr.user_id) as rating_count "
+                f"FROM community_papers cp "
+                f"JOIN users u ON cp.uploader_id = u.id "
+                f"LEFT JOIN paper_ratings pr ON cp.id = pr.paper_id "
+                f"{where} GROUP BY cp.id, u.name ORDER BY cp.created_at DESC LIMIT ? OFFSET ?",
+                params,
+            )
+            return _rows_to_dicts(cur)
+        # rating_sum/rating_count maintained by the trg_paper_ratings_* triggers (migration 54)
+        cur = db.execute(
             f"SELECT cp.*, u.name as uploader_name, "
-            f"COALESCE(AVG(pr.rating), 0) as avg_rating, "
-            f"COUNT(DISTINCT pr.user_id) as rating_count "
+            f"COALESCE(CAST(cp.rating_sum AS REAL) / NULLIF(cp.rating_count, 0), 0) as avg_rating "
             f"FROM community_papers cp "
             f"JOIN users u ON cp.uploader_id = u.id "
-            f"LEFT JOIN paper_ratings pr ON cp.id = pr.paper_id "
-            f"{where} GROUP BY cp.id ORDER BY cp.created_at DESC LIMIT ? OFFSET ?",
+            f"{where} ORDER BY cp.created_at DESC LIMIT ? OFFSET ?",
             params,
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return _rows_to_dicts(cur)
 
     @staticmethod
     def get(paper_id: int) -> dict | None:
@@ -2543,18 +2937,21 @@ class CommunityPaperStoreDB:
         if not row:
             return None
         result = dict(row)
-        result["questions"] = json.loads(result.get("questions", "[]"))
+        result["questions"] = _loads(result.get("questions", "[]"))
         return result
 
     @staticmethod
     def rate(paper_id: int, user_id: int, rating: int):
         db = get_db()
         db.execute(
-            "INSERT OR REPLACE INTO paper_ratings (paper_id, user_id, rating, created_at) "
-            "VALUES (?, ?, ?, ?)",
+            "INSERT INTO paper_ratings (paper_id, user_id, rating, created_at) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(paper_id, user_id) DO UPDATE SET "
+            "rating = excluded.rating, created_at = excluded.created_at",
             (paper_id, user_id, max(1, min(5, rating)), datetime.now().isoformat()),
         )
         db.commit()
+        _bump_cache_version("community_papers")
 
     @staticmethod
     def report(paper_id: int, user_id: int, reason: str):
@@ -2570,12 +2967,11 @@ class CommunityPaperStoreDB:
         db = get_db()
         db.execute("UPDATE community_papers SET approved = 1 WHERE id = ?", (paper_id,))
         db.commit()
+        _bump_cache_version("community_papers")
 
     @staticmethod
     def increment_downloads(paper_id: int):
-        db = get_db()
-        db.execute("UPDATE community_papers SET download_count = download_count + 1 WHERE id = ?", (paper_id,))
-        db.commit()
+        _paper_downloads.add(paper_id)
 
 
 # ── Student Ability (Adaptive) ───────────────────────────────────────
@@ -2616,7 +3012,7 @@ class StudentAbilityStoreDB:
             "WHERE user_id = ? AND subject = ? ORDER BY topic",
             (self.user_id, subject),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
 
 # ── Exam Sessions ────────────────────────────────────────────────────
@@ -2660,21 +3056,20 @@ class ExamSessionStoreDB:
         if not row:
             return None
         result = dict(row)
-        result["questions"] = json.loads(result.get("questions", "[]"))
-        result["answers"] = json.loads(result.get("answers", "[]"))
+        result["questions"] = _loads(result.get("questions", "[]"))
+        result["answers"] = _loads(result.get("answers", "[]"))
         return result
 
     def list_sessions(self, limit: int = 20) -> list[dict]:
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT * FROM exam_sessions WHERE user_id = ? ORDER BY started_at DESC LIMIT ?",
             (self.user_id, limit),
-        ).fetchall()
+        )
         result = []
-        for r in rows:
-            d = dict(r)
-            d["questions"] = json.loads(d.get("questions", "[]"))
-            d["answers"] = json.loads(d.get("answers", "[]"))
+        for d in _rows_to_dicts(cur):
+            d["questions"] = _loads(d.get("questions", "[]"))
+            d["answers"] = _loads(d.get("answers", "[]"))
             result.append(d)
         return result
 
@@ -2708,33 +3103,43 @@ class TutorConversationStoreDB:
         if not row:
             return None
         result = dict(row)
-        result["messages"] = json.loads(result.get("messages", "[]"))
+        result["messages"] = _loads(result.get("messages", "[]"))
         return result
 
     def add_message(self, conv_id: int, role: str, content: str):
         db = get_db()
-        row = db.execute(
-            "SELECT messages FROM tutor_conversations WHERE id = ? AND user_id = ?",
-            (conv_id, self.user_id),
-        ).fetchone()
-        if not row:
-            return
-        messages = json.loads(row["messages"])
-        messages.append({"role": role, "content": content, "timestamp": datetime.now().isoformat()})
-        db.execute(
-            "UPDATE tutor_conversations SET messages = ?, updated_at = ? WHERE id = ?",
-            (json.dumps(messages), datetime.now().isoformat(), conv_id),
-        )
+        now_iso = datetime.now().isoformat()
+        message = {"role": role, "content": content, "timestamp": now_iso}
+        if _is_postgres():
+            row = db.execute(
+                "SELECT messages FROM tutor_conversations WHERE id = ? AND user_id = ?",
+                (conv_id, self.user_id),
+            ).fetchone()
+            if not row:
+                return
+            messages = _loads(row["messages"])
+            messages.append(message)
+            db.execute(
+                "UPDATE tutor_conversations SET messages = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(messages), now_iso, conv_id),
+            )
+        else:
+            # Append in place with JSON1; only the new message crosses over
+            db.execute(
+                "UPDATE tutor_conversations SET messages = json_insert(messages, '$[#]', json(?)), "
+                "updated_at = ? WHERE id = ? AND user_id = ?",
+                (json.dumps(message), now_iso, conv_id, self.user_id),
+            )
         db.commit()
 
     def list_conversations(self, limit: int = 20) -> list[dict]:
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT id, subject, topic, created_at, updated_at FROM tutor_conversations "
             "WHERE user_id = ? ORDER BY updated_at DESC LIMIT ?",
             (self.user_id, limit),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return _rows_to_dicts(cur)
 
 
 # ── Shared Flashcard Decks ──────────────────────────────────────────────
@@ -2778,7 +3183,7 @@ class SharedFlashcardDeckDB:
         result = []
         for r in rows:
             d = dict(r)
-            d["cards"] = json.loads(d.get("cards", "[]"))
+            d["cards"] = _loads(d.get("cards", "[]"))
             avg_rating = d["rating_sum"] / d["rating_count"] if d["rating_count"] > 0 else 0
             d["avg_rating"] = round(avg_rating, 1)
             result.append(d)
@@ -2795,7 +3200,7 @@ class SharedFlashcardDeckDB:
         if not row:
             return None
         d = dict(row)
-        d["cards"] = json.loads(d.get("cards", "[]"))
+        d["cards"] = _loads(d.get("cards", "[]"))
         avg_rating = d["rating_sum"] / d["rating_count"] if d["rating_count"] > 0 else 0
         d["avg_rating"] = round(avg_rating, 1)
         return d
@@ -2803,26 +3208,19 @@ class SharedFlashcardDeckDB:
     @staticmethod
     def import_deck(deck_id: int, user_id: int) -> int:
         """Import a shared deck's cards into user's personal flashcards. Returns count imported."""
-        import uuid
         db = get_db()
         row = db.execute("SELECT cards, subject, topic FROM shared_flashcard_decks WHERE id = ?", (deck_id,)).fetchone()
         if not row:
             return 0
-        cards = json.loads(row["cards"])
         now = datetime.now().isoformat()
-        count = 0
-        for card in cards:
-            card_id = str(uuid.uuid4())[:8]
-            try:
-                db.execute(
-                    "INSERT INTO flashcards (id, user_id, front, back, subject, topic, source, created_at) "
-                    "VALUES (?, ?, ?, ?, ?, ?, 'shared_import', ?)",
-                    (card_id, user_id, card.get("front", ""), card.get("back", ""),
-                     row["subject"], row["topic"], now),
-                )
-                count += 1
-            except Exception:
-                pass
+        subject, topic = row["subject"], row["topic"]
+        cur = db.executemany(
+            "INSERT OR IGNORE INTO flashcards (id, user_id, front, back, subject, topic, source, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'shared_import', ?)",
+            [(_new_id("fc"), user_id, card.get("front", ""), card.get("back", ""), subject, topic, now)
+             for card in _loads(row["cards"])],
+        )
+        count = max(cur.rowcount, 0)
         db.execute(
             "UPDATE shared_flashcard_decks SET download_count = download_count + 1 WHERE id = ?",
             (deck_id,),
@@ -2842,12 +3240,20 @@ class StudyBuddyDB:
                          timezone: str = "", looking_for: str = "study_partner"):
         db = get_db()
         db.execute(
-            "INSERT OR REPLACE INTO study_buddy_preferences "
+            "INSERT INTO study_buddy_preferences "
             "(user_id, subjects, availability, timezone, looking_for, updated_at) "
-            "VALUES (?, ?, ?, ?, ?, ?)",
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET subjects = excluded.subjects, "
+            "availability = excluded.availability, timezone = excluded.timezone, "
+            "looking_for = excluded.looking_for, updated_at = excluded.updated_at",
             (user_id, json.dumps(subjects), availability, timezone,
              looking_for, datetime.now().isoformat()),
         )
+        db.execute("DELETE FROM study_buddy_subjects WHERE user_id = ?", (user_id,))
+        db.executemany(
+            "INSERT OR IGNORE INTO study_buddy_subjects (subject, user_id) VALUES (?, ?)",
+            [(subject, user_id) for subject in set(subjects)],
+        )
         db.commit()
 
     @staticmethod
@@ -2859,46 +3265,40 @@ class StudyBuddyDB:
         if not row:
             return None
         d = dict(row)
-        d["subjects"] = json.loads(d.get("subjects", "[]"))
+        d["subjects"] = _loads(d.get("subjects", "[]"))
         return d
 
     @staticmethod
     def find_matches(user_id: int, limit: int = 10) -> list[dict]:
-        """Find students with overlapping subjects who are looking for study partners."""
-        db = get_db()
-        prefs = db.execute(
-            "SELECT subjects FROM study_buddy_preferences WHERE user_id = ?", (user_id,),
-        ).fetchone()
-        if not prefs:
-            return []
-        my_subjects = set(json.loads(prefs["subjects"]))
-        if not my_subjects:
-            return []
+        """Find students with overlapping subjects who are looking for study partners.
 
+        Best overlap first, then most recently updated preferences.
+        """
+        db = get_db()
+        concat = "string_agg" if _is_postgres() else "GROUP_CONCAT"
+        sep = "\x1f"
         rows = db.execute(
-            "SELECT sbp.*, u.name FROM study_buddy_preferences sbp "
-            "JOIN users u ON sbp.user_id = u.id "
-            "WHERE sbp.user_id != ? "
-            "ORDER BY sbp.updated_at DESC LIMIT ?",
-            (user_id, limit * 3),
+            f"SELECT theirs.user_id, u.name, {concat}(theirs.subject, ?) as common, "
+            "sbp.availability, sbp.timezone, sbp.looking_for "
+            "FROM study_buddy_subjects mine "
+            "JOIN study_buddy_subjects theirs "
+            "ON theirs.subject = mine.subject AND theirs.user_id != mine.user_id "
+            "JOIN study_buddy_preferences sbp ON sbp.user_id = theirs.user_id "
+            "JOIN users u ON u.id = theirs.user_id "
+            "WHERE mine.user_id = ? "
+            "GROUP BY theirs.user_id, u.name, sbp.availability, sbp.timezone, "
+            "sbp.looking_for, sbp.updated_at "
+            "ORDER BY COUNT(*) DESC, sbp.updated_at DESC LIMIT ?",
+            (sep, user_id, limit),
         ).fetchall()
-
-        matches = []
-        for r in rows:
-            their_subjects = set(json.loads(r["subjects"]))
-            overlap = my_subjects & their_subjects
-            if overlap:
-                matches.append({
-                    "user_id": r["user_id"],
-                    "name": r["name"],
-                    "common_subjects": list(overlap),
-                    "availability": r["availability"],
-                    "timezone": r["timezone"],
-                    "looking_for": r["looking_for"],
-                })
-            if len(matches) >= limit:
-                break
-        return matches
+        return [{
+            "user_id": r["user_id"],
+            "name": r["name"],
+            "common_subjects": r["common"].split(sep),
+            "availability": r["availability"],
+            "timezone": r["timezone"],
+            "looking_for": r["looking_for"],
+        } for r in rows]
 
 
 # ── Pagination helpers for stores ─────────────────────────────────
@@ -2912,7 +3312,7 @@ def _paginated_query(query: str, count_query: str, params: list,
     total = total_row[0] if total_row else 0
     offset = (page - 1) * limit
     rows = db.execute(query + " LIMIT ? OFFSET ?", [*params, limit, offset]).fetchall()
-    return [dict(r) for r in rows], total
+    return _rows_to_dicts(rows), total
 
 
 # ── Agent Interaction Store ─────────────────────────────────
@@ -2968,7 +3368,7 @@ class AgentInteractionStoreDB:
             "SELECT * FROM agent_interactions ORDER BY created_at DESC LIMIT ?",
             (limit,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def by_agent(agent: str, limit: int = 50) -> list[dict]:
@@ -2978,7 +3378,7 @@ class AgentInteractionStoreDB:
             "ORDER BY created_at DESC LIMIT ?",
             (agent, limit),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def cost_summary(days: int = 30) -> dict:
@@ -2996,7 +3396,7 @@ class AgentInteractionStoreDB:
             (cutoff,),
         ).fetchall()
         return {
-            "by_day": [dict(r) for r in rows],
+            "by_day": _rows_to_dicts(rows),
             "total_cost": sum(r["total_cost"] or 0 for r in rows),
             "total_calls": sum(r["call_count"] for r in rows),
         }
@@ -3016,7 +3416,7 @@ class AgentInteractionStoreDB:
                 "SELECT agent, feedback_type, COUNT(*) as cnt "
                 "FROM ai_feedback GROUP BY agent, feedback_type",
             ).fetchall()
-        return {"stats": [dict(r) for r in rows]}
+        return {"stats": _rows_to_dicts(rows)}
 
 
 # ── RAG Citation Store ──────────────────────────────────────
@@ -3059,7 +3459,7 @@ class RAGCitationStoreDB:
             "SELECT * FROM rag_citations WHERE interaction_id = ?",
             (interaction_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
 
     @staticmethod
     def source_usage_stats() -> list[dict]:
@@ -3070,4 +3470,4 @@ class RAGCitationStoreDB:
             "FROM rag_citations GROUP BY chunk_source, chunk_subject "
             "ORDER BY citation_count DESC LIMIT 50",
         ).fetchall()
-        return [dict(r) for r in rows]
+        return _rows_to_dicts(rows)
@@ -10,13 +10,116 @@ from __future__ import annotations
 
 import logging
 import smtplib
-from email.mime.text import MIMEText
+import threading
+import time
+import weakref
 from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
 
 from flask import current_app
 
 logger = logging.getLogger(__name__)
 
+# One SMTP session per thread, reused by sends from that thread. Reuse only
+# pays off where a process sends repeatedly: request threads on the sync
+# path, or an RQ ``SimpleWorker`` (the default ``rq worker`` forks a child
+# per job, so each job opens its own session). A single reaper thread closes
+# sessions left unused for SMTP_IDLE_TIMEOUT seconds with QUIT.
+SMTP_IDLE_TIMEOUT = 30.0
+
+_local = threading.local()
+_sessions: weakref.WeakSet = weakref.WeakSet()
+_reaper: threading.Thread | None = None
+_reaper_lock = threading.Lock()
+
+
+class _Session:
+    """A thread's SMTP connection and when it was last used."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.smtp: smtplib.SMTP | None = None
+        self.key: tuple | None = None
+        self.last_used = 0.0
+
+    def idle(self) -> bool:
+        return time.monotonic() - self.last_used >= SMTP_IDLE_TIMEOUT
+
+    def close(self) -> None:
+        smtp, self.smtp = self.smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+
+def _reap_idle() -> None:
+    """Close every idle session that is not in the middle of a send."""
+    for session in list(_sessions):
+        if session.smtp is None or not session.lock.acquire(blocking=False):
+            continue
+        try:
+            if session.idle():
+                session.close()
+        finally:
+            session.lock.release()
+
+
+def _reap_forever() -> None:
+    while True:
+        time.sleep(SMTP_IDLE_TIMEOUT / 2)
+        _reap_idle()
+
+
+def _session() -> _Session:
+    global _reaper
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = _Session()
+        _sessions.add(session)
+        with _reaper_lock:
+            if _reaper is None:
+                _reaper = threading.Thread(
+                    target=_reap_forever, name="smtp-reaper", daemon=True,
+                )
+                _reaper.start()
+    return session
+
+
+def _smtp_connection(config: dict) -> smtplib.SMTP:
+    """Return this thread's SMTP session, reconnecting if it has gone stale.
+
+    Callers hold ``_session().lock``.
+    """
+    key = (
+        config.get("mail_server", "localhost"),
+        config.get("mail_port", 587),
+        config.get("mail_username", ""),
+    )
+    session = _session()
+    if session.smtp is not None:
+        if session.key == key and not session.idle():
+            try:
+                if session.smtp.noop()[0] == 250:
+                    return session.smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+        session.close()
+
+    server, port, username = key
+    password = config.get("mail_password", "")
+    smtp = smtplib.SMTP(server, port)
+    try:
+        smtp.starttls()
+        if username and password:
+            smtp.login(username, password)
+    except Exception:
+        smtp.close()
+        raise
+    session.smtp, session.key = smtp, key
+    return smtp
+
 
 class EmailService:
     @staticmethod
@@ -53,24 +156,24 @@ class EmailService:
     @staticmethod
     def _do_send(to: str, subject: str, body_html: str, config: dict) -> bool:
         """Actual SMTP send — no Flask context required."""
-        try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = config.get("mail_from", "noreply@example.com")
-            msg["To"] = to
-            msg.attach(MIMEText(body_html, "html"))
-
-            server = config.get("mail_server", "localhost")
-            port = config.get("mail_port", 587)
-            username = config.get("mail_username", "")
-            password = config.get("mail_password", "")
-
-            with smtplib.SMTP(server, port) as smtp:
-                smtp.starttls()
-                if username and password:
-                    smtp.login(username, password)
-                smtp.send_message(msg)
-            return True
-        except Exception as e:
-            logger.error("SMTP send failed: %s", e)
-            return False
+        session = _session()
+        with session.lock:
+            try:
+                msg = MIMEMultipart("alternative")
+                msg["Subject"] = subject
+                msg["From"] = config.get("mail_from", "noreply@example.com")
+                msg["To"] = to
+                msg.attach(MIMEText(body_html, "html"))
+
+                try:
+                    _smtp_connection(config).send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Server dropped the idle session between NOOP and send
+                    session.close()
+                    _smtp_connection(config).send_message(msg)
+                session.last_used = time.monotonic()
+                return True
+            except Exception as e:
+                session.close()
+                logger.error("SMTP send failed: %s", e)
+                return False
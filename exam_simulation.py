@@ -4,37 +4,13 @@ Real Exam Paper Simulation — Full IB paper generator with timing and grading.
 
 from __future__ import annotations
 
-from subject_config import get_subject_config
-
-
-class ExamPaperGenerator:
-    """Generates realistic full IB exam papers via the resilient AI layer."""
+import re
+from bisect import bisect_right
+from functools import lru_cache
 
-    def __init__(self, engine=None) -> None:
-        self.engine = engine
-
-    def generate_paper(self, subject: str, level: str = "HL",
-                       paper_number: int = 1) -> dict:
-        """Generate a complete exam paper with section structure.
-
-        Returns dict with: questions, duration_minutes, total_marks, sections.
-        """
-        config = get_subject_config(subject)
-
-        # Determine paper parameters from config
-        duration = 90  # default
-        total_marks = 60
-        if config:
-            components = config.assessment_hl if level == "HL" else config.assessment_sl
-            for comp in components:
-                if f"Paper {paper_number}" in comp.name:
-                    duration = comp.duration_minutes
-                    total_marks = comp.marks
-                    break
-
-        display_subject = subject.replace("_", " ").title()
+from subject_config import get_subject_config
 
-        prompt = f"""You are an IB {display_subject} ({level}) Chief Examiner creating Paper {paper_number}.
+_PAPER_PROMPT = """You are an IB {display_subject} ({level}) Chief Examiner creating Paper {paper_number}.
 
 Generate a COMPLETE exam paper with the following specifications:
 - Subject: {display_subject}
@@ -59,6 +35,104 @@ MARKS: [integer]
 COMMAND_TERM: [the IB command term]
 ---"""
 
+# One "KEY: value" field per line of a generated question block
+_FIELD_RE = re.compile(
+    r"^[ \t]*(SECTION|QUESTION_NUMBER|QUESTION|MARKS|COMMAND_TERM):[ \t]*(.*?)[ \t\r]*$",
+    re.MULTILINE,
+)
+_NON_DIGITS_RE = re.compile(r"\D+")
+
+
+def _parse_questions(text: str) -> list[dict]:
+    """Parse the structured paper text returned by the model into questions."""
+    questions = []
+    current_section = "A"
+    for block in text.split("---"):
+        if "QUESTION:" not in block:
+            continue
+        fields = dict(_FIELD_RE.findall(block))
+        if "SECTION" in fields:
+            current_section = fields["SECTION"]
+
+        question = fields.get("QUESTION", "")
+        if len(question.split()) < 5:
+            continue
+        marks = fields.get("MARKS")
+        if marks is not None:
+            digits = _NON_DIGITS_RE.sub("", marks)
+            marks = int(digits) if digits else 4
+        try:
+            number = int(fields.get("QUESTION_NUMBER", len(questions) + 1))
+        except ValueError:
+            number = len(questions) + 1
+        questions.append({
+            "number": number,
+            "question_text": question,
+            "section": current_section,
+            "marks": 4 if marks is None else marks,
+            "command_term": fields.get("COMMAND_TERM", ""),
+        })
+    return questions
+
+
+@lru_cache(maxsize=256)
+def _paper_spec(subject: str, level: str, paper_number: int) -> tuple[int, int]:
+    """(duration_minutes, total_marks) of a paper, defaulting to (90, 60)."""
+    config = get_subject_config(subject)
+    if config:
+        components = config.assessment_hl if level == "HL" else config.assessment_sl
+        for comp in components:
+            if f"Paper {paper_number}" in comp.name:
+                return comp.duration_minutes, comp.marks
+    return 90, 60
+
+
+# Minimum percentage for grades 1-7 when a subject has no boundaries
+_DEFAULT_THRESHOLDS = (0, 25, 40, 50, 60, 70, 80)
+
+
+@lru_cache(maxsize=256)
+def _grade_thresholds(subject: str, level: str) -> tuple:
+    """Ascending minimum percentages for grades 1-7, for ``bisect_right``.
+
+    Each threshold is the lowest boundary at or above that grade, so the
+    bisect finds the highest grade whose own boundary is met, exactly as a
+    top-down scan of the raw boundaries would.
+    """
+    config = get_subject_config(subject)
+    if config:
+        boundaries = config.grade_boundaries_hl if level == "HL" else config.grade_boundaries_sl
+        if boundaries:
+            thresholds = []
+            lowest = float("inf")
+            for grade in range(7, 0, -1):
+                lowest = min(lowest, boundaries.get(grade, 0))
+                thresholds.append(lowest)
+            return tuple(reversed(thresholds))
+    return _DEFAULT_THRESHOLDS
+
+
+class ExamPaperGenerator:
+    """Generates realistic full IB exam papers via the resilient AI layer."""
+
+    def __init__(self, engine=None) -> None:
+        self.engine = engine
+
+    def generate_paper(self, subject: str, level: str = "HL",
+                       paper_number: int = 1) -> dict:
+        """Generate a complete exam paper with section structure.
+
+        Returns dict with: questions, duration_minutes, total_marks, sections.
+        """
+        duration, total_marks = _paper_spec(subject, level, paper_number)
+
+        display_subject = subject.replace("_", " ").title()
+
+        prompt = _PAPER_PROMPT.format(
+            display_subject=display_subject, level=level, paper_number=paper_number,
+            duration=duration, total_marks=total_marks,
+        )
+
         from ai_resilience import resilient_llm_call
         text, _meta = resilient_llm_call(
             provider="gemini",
@@ -67,44 +141,7 @@ COMMAND_TERM: [the IB command term]
             system="You are an IB Chief Examiner. Output only the structured exam paper.",
         )
 
-        questions = []
-        current_section = "A"
-        blocks = text.split("---")
-
-        for block in blocks:
-            block = block.strip()
-            if not block or "QUESTION:" not in block:
-                continue
-
-            q = {}
-            for line in block.splitlines():
-                line = line.strip()
-                if line.startswith("SECTION:"):
-                    current_section = line.split(":", 1)[1].strip()
-                elif line.startswith("QUESTION_NUMBER:"):
-                    q["number"] = line.split(":", 1)[1].strip()
-                elif line.startswith("QUESTION:"):
-                    q["question"] = line.split(":", 1)[1].strip()
-                elif line.startswith("MARKS:"):
-                    try:
-                        q["marks"] = int("".join(c for c in line.split(":", 1)[1] if c.isdigit()))
-                    except (ValueError, IndexError):
-                        q["marks"] = 4
-                elif line.startswith("COMMAND_TERM:"):
-                    q["command_term"] = line.split(":", 1)[1].strip()
-
-            if "question" in q and len(q["question"].split()) >= 5:
-                # Normalise keys for the frontend
-                q["question_text"] = q.pop("question")
-                q.setdefault("section", current_section)
-                q.setdefault("marks", 4)
-                q.setdefault("command_term", "")
-                q.setdefault("number", str(len(questions) + 1))
-                try:
-                    q["number"] = int(q["number"])
-                except (ValueError, TypeError):
-                    q["number"] = len(questions) + 1
-                questions.append(q)
+        questions = _parse_questions(text)
 
         return {
             "subject": subject,
@@ -123,21 +160,4 @@ COMMAND_TERM: [the IB command term]
         if total_marks <= 0:
             return 1
         percentage = (earned_marks / total_marks) * 100
-
-        config = get_subject_config(subject)
-        if config:
-            boundaries = config.grade_boundaries_hl if level == "HL" else config.grade_boundaries_sl
-            if boundaries:
-                for grade in range(7, 0, -1):
-                    if percentage >= boundaries.get(grade, 0):
-                        return grade
-                return 1
-
-        # Default boundaries
-        if percentage >= 80: return 7
-        elif percentage >= 70: return 6
-        elif percentage >= 60: return 5
-        elif percentage >= 50: return 4
-        elif percentage >= 40: return 3
-        elif percentage >= 25: return 2
-        return 1
+        return max(bisect_right(_grade_thresholds(subject, level), percentage), 1)
@@ -6,10 +6,18 @@ workflow for student coursework (IAs, EEs, TOK essays).
 
 from __future__ import annotations
 
+import hashlib
 import json
+import secrets
 from datetime import datetime
+from profile import Notification
 
+from credit_store import FEATURE_COSTS, CreditStoreDB
 from database import get_db
+from db_stores import NotificationStoreDB
+
+# Agent review output is reused for identical resubmissions for a week
+DIAGNOSTIC_CACHE_TTL = 7 * 86400
 
 
 class ExaminerPipeline:
@@ -29,12 +37,12 @@ class ExaminerPipeline:
         # Generate AI diagnostic
         diagnostic = self.generate_ai_diagnostic(text, doc_type, subject)
 
-        # Deduct credits
-        from credit_store import CreditStoreDB, FEATURE_COSTS
+        # Deduct credits; committed together with the review row below
+        db = get_db()
         store = CreditStoreDB(user_id)
         cost = FEATURE_COSTS.get("examiner_review", 500)
         debit_result = store.debit(cost, "examiner_review",
-                                   f"Review: {doc_type} - {title}")
+                                   f"Review: {doc_type} - {title}", commit=False)
         if not debit_result["success"]:
             return {
                 "success": False,
@@ -43,7 +51,6 @@ class ExaminerPipeline:
                 "balance": debit_result["balance_after"],
             }
 
-        db = get_db()
         now = datetime.now().isoformat()
         predicted = diagnostic.get("predicted_grade", "")
 
@@ -53,7 +60,7 @@ class ExaminerPipeline:
             "ai_diagnostic, ai_predicted_grade, status, credits_charged, submitted_at) "
             "VALUES (?, ?, ?, ?, ?, ?, ?, 'submitted', ?, ?)",
             (user_id, doc_type, subject, title, text,
-             json.dumps(diagnostic), str(predicted), cost, now),
+             json.dumps(diagnostic, separators=(",", ":")), str(predicted), cost, now),
         )
         db.commit()
 
@@ -79,22 +86,24 @@ class ExaminerPipeline:
             "formatting_issues": [],
         }
 
-        # Try using CourseworkAgent for review
-        try:
-            from agents.coursework_agent import CourseworkAgent
-            agent = CourseworkAgent(None)
-            result = agent.review(
-                text=text, doc_type=doc_type, subject=subject,
-            )
-            if result and result.content:
-                diagnostic["ai_review"] = str(result.content)
-                if result.metadata and isinstance(result.metadata, dict):
-                    diagnostic["criterion_scores"] = result.metadata.get("criteria", {})
-                    diagnostic["predicted_grade"] = str(result.metadata.get("grade", ""))
-                    diagnostic["strengths"] = result.metadata.get("strengths", [])
-                    diagnostic["improvements"] = result.metadata.get("improvements", [])
-        except Exception:
-            diagnostic["ai_review"] = "AI review unavailable"
+        # Try using CourseworkAgent for review; resubmissions of the same
+        # draft reuse the earlier result
+        from cache_backend import get_cache
+        cache = get_cache()
+        cache_key = "diagnostic:" + hashlib.sha256(
+            f"{doc_type}|{subject}|{text.strip()}".encode()
+        ).hexdigest()
+        review = cache.get(cache_key)
+        if review is None:
+            try:
+                review = self._agent_review(text, doc_type, subject)
+            except Exception:
+                diagnostic["ai_review"] = "AI review unavailable"
+            else:
+                if review:
+                    cache.set(cache_key, review, ttl=DIAGNOSTIC_CACHE_TTL)
+        if review:
+            diagnostic.update(review)
 
         # Word count checks
         limits = {"ia": 2200, "ee": 4000, "tok_essay": 1600}
@@ -106,6 +115,24 @@ class ExaminerPipeline:
 
         return diagnostic
 
+    @staticmethod
+    def _agent_review(text: str, doc_type: str, subject: str) -> dict:
+        """Diagnostic fields produced by CourseworkAgent (empty if it returned nothing)."""
+        from agents.coursework_agent import CourseworkAgent
+        agent = CourseworkAgent(None)
+        result = agent.review(
+            text=text, doc_type=doc_type, subject=subject,
+        )
+        review: dict = {}
+        if result and result.content:
+            review["ai_review"] = str(result.content)
+            if result.metadata and isinstance(result.metadata, dict):
+                review["criterion_scores"] = result.metadata.get("criteria", {})
+                review["predicted_grade"] = str(result.metadata.get("grade", ""))
+                review["strengths"] = result.metadata.get("strengths", [])
+                review["improvements"] = result.metadata.get("improvements", [])
+        return review
+
     @staticmethod
     def assign_to_examiner(review_id: int, examiner_id: int) -> None:
         """Assign a review to an examiner."""
@@ -139,29 +166,22 @@ class ExaminerPipeline:
         """Mark review as delivered to student + send notification."""
         db = get_db()
         now = datetime.now().isoformat()
-        db.execute(
+        review = db.execute(
             "UPDATE examiner_reviews SET status = 'delivered', "
-            "delivered_at = ? WHERE id = ?",
+            "delivered_at = ? WHERE id = ? RETURNING user_id, doc_type, title",
             (now, review_id),
-        )
-
-        # Notify student
-        review = db.execute(
-            "SELECT user_id, doc_type, subject, title FROM examiner_reviews WHERE id = ?",
-            (review_id,),
         ).fetchone()
+
+        # Notify student, in the same transaction as the status change
         if review:
             try:
-                from db_stores import NotificationStoreDB
-                from profile import Notification
-                import secrets
-
                 notif = NotificationStoreDB(review["user_id"])
                 notif.add(Notification(
                     id=secrets.token_hex(8),
                     type="review_delivered",
                     title=f"Your {review['doc_type'].upper()} review is ready!",
                     body=f"An examiner has reviewed your {review['title']}",
+                    created_at=now,
                     action_url=f"/reviews/{review_id}",
                 ))
             except Exception:
@@ -189,24 +209,24 @@ class ExaminerPipeline:
     def student_reviews(user_id: int) -> list[dict]:
         """Get all reviews for a student."""
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT id, doc_type, subject, title, status, ai_predicted_grade, "
             "examiner_grade, submitted_at, delivered_at "
             "FROM examiner_reviews WHERE user_id = ? ORDER BY submitted_at DESC",
             (user_id,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return [dict(r) for r in cur]
 
     @staticmethod
     def pending_reviews() -> list[dict]:
         """Get all pending/submitted reviews (examiner queue)."""
         db = get_db()
-        rows = db.execute(
+        cur = db.execute(
             "SELECT er.id, er.doc_type, er.subject, er.title, er.status, "
             "er.ai_predicted_grade, er.submitted_at, u.name as student_name "
             "FROM examiner_reviews er "
             "JOIN users u ON er.user_id = u.id "
             "WHERE er.status IN ('submitted', 'assigned') "
             "ORDER BY er.submitted_at ASC",
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return [dict(r) for r in cur]
@@ -3,25 +3,29 @@
 from __future__ import annotations
 
 from datetime import date
+
 try:
     from fpdf import FPDF
 except ImportError:
     FPDF = None
 
 from profile import (
-    StudentProfile,
-    GradeDetailLog,
+    MISCONCEPTION_PATTERNS,
     ActivityLog,
     GamificationProfile,
-    TopicProgressStore,
+    GradeDetailLog,
     MisconceptionLog,
-    MISCONCEPTION_PATTERNS,
+    StudentProfile,
+    TopicProgressStore,
 )
+
 from subject_config import get_syllabus_topics
 
 
 def _safe(text: str) -> str:
     """Replace unicode chars that latin-1 Helvetica can't handle."""
+    if text.isascii():
+        return text
     return (
         text
         .replace("\u2014", "-")   # em-dash
@@ -42,15 +46,20 @@ def generate_pdf_report(
     gamification: GamificationProfile,
     topic_progress: TopicProgressStore,
     misconception_log: MisconceptionLog,
-) -> bytes:
-    """Generate a multi-page PDF progress report and return as bytes."""
+) -> bytearray:
+    """Generate a multi-page PDF progress report and return its bytes.
+
+    fpdf2 builds the document in a bytearray; it is returned as-is so the
+    route can hand it to Response without another copy.
+    """
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
 
     _render_cover(pdf, profile, grade_log, gamification, activity_log)
-    _render_subjects(pdf, profile, grade_log, topic_progress)
+    coverage = _syllabus_coverage(profile, topic_progress)
+    _render_subjects(pdf, profile, grade_log, coverage)
     _render_analysis(pdf, grade_log, profile)
-    _render_recommendations(pdf, profile, grade_log, misconception_log, topic_progress)
+    _render_recommendations(pdf, profile, grade_log, misconception_log, coverage)
 
     return pdf.output()
 
@@ -158,6 +167,26 @@ def _render_cover(
     pdf.cell(0, 6, f"Days Active (last 7): {days_7}/7", new_x="LMARGIN", new_y="NEXT")
 
 
+def _syllabus_coverage(
+    profile: StudentProfile, topic_progress: TopicProgressStore | None,
+) -> dict[str, tuple[float, list[str]]]:
+    """Coverage % and uncovered topic names per subject with a syllabus.
+
+    Both report pages use these, so each subject's progress is read once.
+    """
+    coverage: dict[str, tuple[float, list[str]]] = {}
+    if not topic_progress:
+        return coverage
+    for s in profile.subjects:
+        topics = get_syllabus_topics(s.name)
+        if not topics:
+            continue
+        tp = topic_progress.get(s.name)
+        uncovered = [t.name for t in topics if not tp.topics.get(t.id)]
+        coverage[s.name] = (tp.overall_coverage(topics), uncovered)
+    return coverage
+
+
 # ── Page 2: Subject Breakdown ──────────────────────────────────
 
 
@@ -165,25 +194,28 @@ def _render_subjects(
     pdf: FPDF,
     profile: StudentProfile,
     grade_log: GradeDetailLog,
-    tp_store: TopicProgressStore,
+    coverage: dict[str, tuple[float, list[str]]],
 ) -> None:
     _header(pdf, "Subject Breakdown")
 
     gaps = profile.compute_gaps(grade_log)
-    subject_stats = grade_log.subject_stats()
+    # One pass over the log instead of a by_subject() lookup per table row
+    by_subject: dict[str, list] = {}
+    for e in grade_log.entries:
+        by_subject.setdefault(e.subject_display, []).append(e)
 
     # Table header
     pdf.set_font("Helvetica", "B", 9)
     pdf.set_fill_color(241, 245, 249)
     col_w = [50, 15, 18, 22, 15, 25, 25, 20]
     headers = ["Subject", "Level", "Target", "Predicted", "Gap", "Status", "Coverage", "Trend"]
-    for i, h in enumerate(headers):
-        pdf.cell(col_w[i], 7, h, border=1, fill=True, align="C")
+    for w, h in zip(col_w, headers):
+        pdf.cell(w, 7, h, border=1, fill=True, align="C")
     pdf.ln()
 
     pdf.set_font("Helvetica", "", 9)
     for g in gaps:
-        entries = grade_log.by_subject(g["subject"])
+        entries = by_subject.get(g["subject"], [])
 
         # Trend
         trend = "-"
@@ -199,11 +231,9 @@ def _render_subjects(
                 trend = "Stable"
 
         # Coverage
-        topics = get_syllabus_topics(g["subject"])
         coverage_str = "-"
-        if topics:
-            tp = tp_store.get(g["subject"])
-            coverage_str = f"{tp.overall_coverage(topics):.0f}%"
+        if g["subject"] in coverage:
+            coverage_str = f"{coverage[g['subject']][0]:.0f}%"
 
         row = [
             g["subject"][:20],
@@ -215,15 +245,15 @@ def _render_subjects(
             coverage_str,
             trend,
         ]
-        for i, val in enumerate(row):
-            pdf.cell(col_w[i], 6, _safe(val), border=1, align="C")
+        for w, val in zip(col_w, row):
+            pdf.cell(w, 6, _safe(val), border=1, align="C")
         pdf.ln()
 
     pdf.ln(6)
 
     # Per-subject grade history
     for s in profile.subjects:
-        entries = grade_log.by_subject(s.name)
+        entries = by_subject.get(s.name, [])
         if not entries:
             continue
         pdf.set_font("Helvetica", "B", 10)
@@ -255,8 +285,8 @@ def _render_analysis(
         pdf.set_fill_color(241, 245, 249)
         ct_col_w = [50, 30, 20, 30, 30]
         ct_headers = ["Command Term", "Avg %", "Count", "Avg Grade", "Status"]
-        for i, h in enumerate(ct_headers):
-            pdf.cell(ct_col_w[i], 7, h, border=1, fill=True, align="C")
+        for w, h in zip(ct_col_w, ct_headers):
+            pdf.cell(w, 7, h, border=1, fill=True, align="C")
         pdf.ln()
 
         pdf.set_font("Helvetica", "", 9)
@@ -270,8 +300,8 @@ def _render_analysis(
                 f"{stats['avg_grade']:.1f}",
                 status,
             ]
-            for i, val in enumerate(row):
-                pdf.cell(ct_col_w[i], 6, _safe(val), border=1, align="C")
+            for w, val in zip(ct_col_w, row):
+                pdf.cell(w, 6, _safe(val), border=1, align="C")
             pdf.ln()
 
         pdf.ln(4)
@@ -292,9 +322,13 @@ def _render_analysis(
         _section_title(pdf, "Overall Statistics")
         pdf.set_font("Helvetica", "", 10)
         total = len(entries)
-        avg_pct = sum(e.percentage for e in entries) / total
-        avg_grade = sum(e.grade for e in entries) / total
-        high_grade = max(e.grade for e in entries)
+        pct_sum = grade_sum = high_grade = 0
+        for e in entries:
+            pct_sum += e.percentage
+            grade_sum += e.grade
+            high_grade = max(high_grade, e.grade)
+        avg_pct = pct_sum / total
+        avg_grade = grade_sum / total
         pdf.cell(0, 6, f"Total Questions Graded: {total}", new_x="LMARGIN", new_y="NEXT")
         pdf.cell(0, 6, f"Average Percentage: {avg_pct:.0f}%", new_x="LMARGIN", new_y="NEXT")
         pdf.cell(0, 6, f"Average Grade: {avg_grade:.1f}/7", new_x="LMARGIN", new_y="NEXT")
@@ -309,7 +343,7 @@ def _render_recommendations(
     profile: StudentProfile,
     grade_log: GradeDetailLog,
     misconception_log: MisconceptionLog,
-    topic_progress=None,
+    coverage: dict[str, tuple[float, list[str]]],
 ) -> None:
     _header(pdf, "Recommendations & Weak Areas")
 
@@ -331,7 +365,13 @@ def _render_recommendations(
 
     # Gap-based recommendations
     gaps = profile.compute_gaps(grade_log)
-    behind = [g for g in gaps if g["status"] == "behind"]
+    behind = []
+    total_gap = 0
+    for g in gaps:
+        if g["status"] == "behind":
+            behind.append(g)
+        if g["status"] != "no_data" and g["gap"] > 0:
+            total_gap += g["gap"]
     if behind:
         _section_title(pdf, "Priority Subjects")
         pdf.set_font("Helvetica", "", 10)
@@ -346,14 +386,12 @@ def _render_recommendations(
     # Study allocation suggestion
     _section_title(pdf, "Suggested Study Allocation")
     pdf.set_font("Helvetica", "", 10)
-    total_gap = sum(max(g["gap"], 0) for g in gaps if g["status"] != "no_data")
+    even_pct = round(100 / len(gaps)) if gaps else 0
     for g in gaps:
-        if g["status"] == "no_data":
-            pct = round(100 / len(gaps)) if gaps else 0
-        elif total_gap > 0 and g["gap"] > 0:
+        if g["status"] != "no_data" and total_gap > 0 and g["gap"] > 0:
             pct = round((g["gap"] / total_gap) * 100)
         else:
-            pct = round(100 / len(gaps)) if gaps else 0
+            pct = even_pct
         pdf.cell(0, 6, _safe(f"  - {g['subject']}: ~{pct}% of study time"), new_x="LMARGIN", new_y="NEXT")
 
     pdf.ln(6)
@@ -362,18 +400,12 @@ def _render_recommendations(
     _section_title(pdf, "Syllabus Coverage Summary")
     pdf.set_font("Helvetica", "", 10)
     for s in profile.subjects:
-        topics = get_syllabus_topics(s.name)
-        if not topics or not topic_progress:
+        if s.name not in coverage:
             continue
-        tp_subj = topic_progress.get(s.name)
-        overall = tp_subj.overall_coverage(topics)
+        overall, uncovered = coverage[s.name]
         pdf.cell(0, 6, _safe(f"  {s.name}: {overall:.0f}% covered"), new_x="LMARGIN", new_y="NEXT")
 
         # List uncovered topics
-        uncovered = []
-        for t in topics:
-            if not tp_subj.topics.get(t.id):
-                uncovered.append(t.name)
         if uncovered:
             pdf.set_font("Helvetica", "I", 9)
             pdf.set_text_color(150, 150, 150)
@@ -7,6 +7,7 @@ Replaces the nonlocal closure pattern from create_app().
 from __future__ import annotations
 
 import os
+import threading
 
 
 def _create_limiter():
@@ -44,23 +45,30 @@ class EngineManager:
 
     _engine = None
     _grader = None
+    # Re-entrant: get_grader builds the engine while holding it
+    _lock = threading.RLock()
 
     @classmethod
     def get_engine(cls):
         if cls._engine is None:
-            from rag_engine import RAGEngine
-            cls._engine = RAGEngine()
+            with cls._lock:
+                if cls._engine is None:
+                    from rag_engine import RAGEngine
+                    cls._engine = RAGEngine()
         return cls._engine
 
     @classmethod
     def get_grader(cls):
         if cls._grader is None:
-            from grader import IBGrader
-            cls._grader = IBGrader(cls.get_engine())
+            with cls._lock:
+                if cls._grader is None:
+                    from grader import IBGrader
+                    cls._grader = IBGrader(cls.get_engine())
         return cls._grader
 
     @classmethod
     def reset(cls):
         """Reset both singletons — called after upload/delete doc."""
-        cls._engine = None
-        cls._grader = None
+        with cls._lock:
+            cls._engine = None
+            cls._grader = None
@@ -1,7 +1,9 @@
 """One-time script to generate PWA icons using Pillow (pure Python, no cairo)."""
-from PIL import Image, ImageDraw, ImageFont
 import math
 
+from PIL import Image, ImageDraw, ImageFont
+
+
 def create_icon(size):
     """Create an indigo icon with a book/cap glyph."""
     img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
@@ -30,23 +32,7 @@ def create_icon(size):
     draw.line([(cx + 80 * s, cy - 70 * s), (cx + 80 * s, cy - 35 * s)], fill='white', width=max(1, int(3 * s)))
     draw.ellipse([cx + 75 * s, cy - 37 * s, cx + 85 * s, cy - 27 * s], fill='white')
 
-    # Draw open book
-    book_points_left = []
-    book_points_right = []
-    for i in range(20):
-        t = i / 19
-        # Left page curve
-        x = cx - 120 * s + t * 120 * s
-        y_top = cy + 20 * s - 70 * s * (1 - (2 * t - 1) ** 2)
-        book_points_left.append((x, y_top))
-
-    for i in range(20):
-        t = i / 19
-        x = cx + t * 120 * s
-        y_top = cy + 20 * s - 70 * s * (1 - (2 * t - 1) ** 2)
-        book_points_right.append((x, y_top))
-
-    # Simplified book shape
+    # Draw open book (simplified shape)
     book_left = [
         (cx - 120 * s, cy + 80 * s),
         (cx - 120 * s, cy + 20 * s),
@@ -92,13 +78,12 @@ def create_icon(size):
 
 
 if __name__ == '__main__':
-    for sz in [512, 192]:
-        img = create_icon(sz)
+    icons = {sz: create_icon(sz) for sz in [512, 192]}
+    for sz, img in icons.items():
         img.save(f'static/icons/icon-{sz}.png')
         print(f'Created icon-{sz}.png')
 
     # Maskable: same icon
-    img = create_icon(512)
-    img.save('static/icons/icon-maskable-512.png')
+    icons[512].save('static/icons/icon-maskable-512.png')
     print('Created icon-maskable-512.png')
     print('Done!')
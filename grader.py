@@ -9,21 +9,31 @@ cites specific rubric points when deducting marks.
 from __future__ import annotations
 
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from pathlib import Path
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from rag_engine import RAGEngine
 
-from subject_config import get_subject_config, SubjectConfig
+from subject_config import SubjectConfig, get_subject_config
 
-import os
+logger = logging.getLogger(__name__)
 
-SESSION_DIR = Path(__file__).parent / "session_data"
-if not os.environ.get("VERCEL"):
-    SESSION_DIR.mkdir(exist_ok=True)
+# Retrieved context budget per grading prompt, in characters (chunks are
+# packed most-relevant first; one chunk is ~800 words)
+MARK_CONTEXT_CHARS = 8000
+GUIDE_CONTEXT_CHARS = 3000
+
+# Identical grading prompts (same question, answer and mark scheme context)
+# reuse the examiner response for a day instead of calling the model again
+GRADE_CACHE_TTL = 86400
+
+# The syllabus lookup runs here while the request thread fetches the mark
+# scheme; both are independent vector-store queries
+_retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="grader-retrieval")
 
 IB_EXAMINER_SYSTEM_PROMPT = """You are a SENIOR IB EXAMINER with 15+ years of experience marking
 IB Diploma Programme papers. You are precise, fair, but strict.
@@ -89,6 +99,33 @@ MODEL_ANSWER:
 [Write a concise model answer that would earn full marks on this question. Use bullet points where appropriate. This helps the student understand what an ideal response looks like.]"""
 
 
+def _compact_context(chunks: list, max_chars: int) -> str:
+    """Join retrieved chunks, most relevant first, within a character budget.
+
+    Repeats of the same text (e.g. a mark scheme uploaded twice) are sent
+    once; a first chunk larger than the budget is cut rather than dropped.
+    """
+    seen: set[str] = set()
+    parts: list[str] = []
+    used = 0
+    total = 0
+    for c in chunks:
+        total += len(c.text)
+        key = " ".join(c.text.split())
+        if key in seen:
+            continue
+        seen.add(key)
+        if not parts:
+            parts.append(c.text[:max_chars])
+            used = len(parts[0])
+        elif used + len(c.text) <= max_chars:
+            parts.append(c.text)
+            used += len(c.text)
+    if total > used:
+        logger.debug("Grading context compacted from %d to %d chars", total, used)
+    return "\n---\n".join(parts)
+
+
 @dataclass
 class GradeResult:
     question: str
@@ -124,24 +161,8 @@ class IBGrader:
     @property
     def history(self) -> list[GradeResult]:
         """Load history from DB on demand."""
-        results = []
-        for entry in self._db.history:
-            results.append(GradeResult(
-                question=entry["question"],
-                answer=entry.get("answer", ""),
-                mark_earned=entry["mark_earned"],
-                mark_total=entry["mark_total"],
-                grade=entry["grade"],
-                percentage=entry["percentage"],
-                strengths=entry["strengths"],
-                improvements=entry["improvements"],
-                examiner_tip=entry["examiner_tip"],
-                full_commentary=entry.get("full_commentary", ""),
-                raw_response=entry.get("raw_response", ""),
-                model_answer=entry.get("model_answer", ""),
-                timestamp=entry.get("timestamp", ""),
-            ))
-        return results
+        # GradeHistoryDB rows carry exactly the GradeResult fields
+        return [GradeResult(**entry) for entry in self._db.history]
 
     def grade(
         self,
@@ -156,22 +177,27 @@ class IBGrader:
         # Retrieve relevant mark scheme criteria (if documents exist)
         mark_chunks = []
         guide_chunks = []
+        guide_future = _retrieval_pool.submit(
+            self.engine.query,
+            query_text=f"{subject} syllabus {question[:80]}",
+            n_results=3,
+            doc_type="subject_guide",
+        )
         try:
             mark_chunks = self.engine.query(
                 query_text=f"{subject} {command_term} mark scheme {question[:100]}",
                 n_results=5,
                 doc_type="mark_scheme",
             )
-            guide_chunks = self.engine.query(
-                query_text=f"{subject} syllabus {question[:80]}",
-                n_results=3,
-                doc_type="subject_guide",
-            )
-        except (FileNotFoundError, Exception):
+        except Exception:
+            pass
+        try:
+            guide_chunks = guide_future.result()
+        except Exception:
             pass
 
-        context_marks = "\n---\n".join(c.text for c in mark_chunks) or "No mark scheme available — use general IB marking criteria."
-        context_guide = "\n---\n".join(c.text for c in guide_chunks) or ""
+        context_marks = _compact_context(mark_chunks, MARK_CONTEXT_CHARS) or "No mark scheme available — use general IB marking criteria."
+        context_guide = _compact_context(guide_chunks, GUIDE_CONTEXT_CHARS)
 
         # Build subject-specific grading context
         subject_context = ""
@@ -211,7 +237,9 @@ STUDENT ANSWER:
 
 Grade this answer according to your protocol. The question is worth {marks} marks."""
 
-        raw = self.engine.ask(grading_prompt, system=IB_EXAMINER_SYSTEM_PROMPT)
+        raw = self.engine.ask(
+            grading_prompt, system=IB_EXAMINER_SYSTEM_PROMPT, cache_ttl=GRADE_CACHE_TTL,
+        )
 
         result = self._parse_grade(question, answer, marks, raw)
         self._db.append(result)
@@ -229,7 +257,8 @@ Grade this answer according to your protocol. The question is worth {marks} mark
 
     def get_analytics(self) -> dict:
         """Return analytics across all graded answers."""
-        if not self.history:
+        scores = self._db.scores()
+        if not scores:
             return {
                 "total_answers": 0,
                 "average_grade": 0.0,
@@ -238,20 +267,26 @@ Grade this answer according to your protocol. The question is worth {marks} mark
                 "trend": [],
             }
 
-        grades = [r.grade for r in self.history]
-        percentages = [r.percentage for r in self.history]
-        dist = {g: grades.count(g) for g in range(1, 8) if grades.count(g) > 0}
+        grades = [s["grade"] for s in scores]
+        percentages = [s["percentage"] for s in scores]
+        counts = [0] * 8
+        for g in grades:
+            if 1 <= g <= 7:
+                counts[g] += 1
+        dist = {g: counts[g] for g in range(1, 8) if counts[g]}
 
-        # Trend: moving average over last 10
+        # Trend: moving average over last 10, kept as a running window sum
         window = min(10, len(percentages))
         trend = []
-        for i in range(len(percentages)):
-            start = max(0, i - window + 1)
-            avg = sum(percentages[start : i + 1]) / (i - start + 1)
-            trend.append(round(avg, 1))
+        running = 0
+        for i, pct in enumerate(percentages):
+            running += pct
+            if i >= window:
+                running -= percentages[i - window]
+            trend.append(round(running / min(i + 1, window), 1))
 
         return {
-            "total_answers": len(self.history),
+            "total_answers": len(scores),
             "average_grade": round(sum(grades) / len(grades), 2),
             "average_percentage": round(sum(percentages) / len(percentages), 1),
             "grade_distribution": dist,
@@ -260,12 +295,11 @@ Grade this answer according to your protocol. The question is worth {marks} mark
 
     def get_weakness_report(self) -> str:
         """Analyze all improvements across history to find patterns."""
-        if len(self.history) < 3:
+        recent = self._db.recent_improvements(20)
+        if len(recent) < 3:
             return "Need at least 3 graded answers to generate a weakness report."
 
-        all_improvements = []
-        for r in self.history[-20:]:
-            all_improvements.extend(r.improvements)
+        all_improvements = [imp for improvements in recent for imp in improvements]
 
         prompt = f"""Analyze these examiner improvement notes from a student's recent IB answers
 and identify the TOP 3 recurring weaknesses / bad habits:
@@ -7,13 +7,15 @@ Extracted from app.py to break circular dependencies.
 from __future__ import annotations
 
 import os
+import threading
 from collections.abc import Callable
-from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from functools import wraps
 from pathlib import Path
 from typing import Any
 
-from flask import abort, redirect, request, url_for
+from flask import abort, current_app, redirect, request, url_for
 from flask_login import current_user
 
 from auth import login_manager
@@ -142,21 +144,22 @@ def generate_recommendation(profile: Any, grade_log: Any) -> dict[str, str]:
     }
 
 
+# Feedback keywords that signal a command-term expectation was missed
+_COMMAND_TERM_FEEDBACK_KEYWORDS = {
+    "evaluate": ("one-sided", "counter-argument", "both sides", "balanced", "limitation"),
+    "discuss": ("one-sided", "counter-argument", "both sides", "balanced"),
+    "analyse": ("break down", "component", "relationship", "cause"),
+    "explain": ("reason", "mechanism", "cause", "why"),
+    "compare": ("similarit", "difference", "contrast", "both"),
+    "define": ("definition", "precise", "terminology"),
+}
+
+
 def _command_term_alignment(command_term: str, improvements: list[str]) -> str:
     if not command_term or not improvements:
         return ""
 
-    ct_lower = command_term.lower()
-    checks = {
-        "evaluate": ["one-sided", "counter-argument", "both sides", "balanced", "limitation"],
-        "discuss": ["one-sided", "counter-argument", "both sides", "balanced"],
-        "analyse": ["break down", "component", "relationship", "cause"],
-        "explain": ["reason", "mechanism", "cause", "why"],
-        "compare": ["similarit", "difference", "contrast", "both"],
-        "define": ["definition", "precise", "terminology"],
-    }
-
-    keywords = checks.get(ct_lower, [])
+    keywords = _COMMAND_TERM_FEEDBACK_KEYWORDS.get(command_term.lower())
     if not keywords:
         return ""
 
@@ -201,12 +204,13 @@ def _generate_text_insights(
             "action": f"Use Command Term Trainer to practice '{ct_name}' questions.",
         })
 
-    entries = grade_log.entries
-    if len(entries) >= 4:
-        recent = entries[-4:]
-        older = entries[-8:-4] if len(entries) >= 8 else entries[:4]
-        recent_avg = sum(e.percentage for e in recent) / len(recent)
-        older_avg = sum(e.percentage for e in older) / len(older)
+    total, avg_pct, latest = grade_log.percentage_summary(8)
+    if total >= 4:
+        recent = latest[-4:]
+        # With fewer than 8 answers, latest holds them all
+        older = latest[-8:-4] if total >= 8 else latest[:4]
+        recent_avg = sum(recent) / len(recent)
+        older_avg = sum(older) / len(older)
         diff = recent_avg - older_avg
 
         if diff > 5:
@@ -224,9 +228,7 @@ def _generate_text_insights(
                 "action": "Consider reviewing fundamentals before attempting harder questions.",
             })
 
-    if len(insights) < 3 and len(entries) > 0:
-        total = len(entries)
-        avg_pct = sum(e.percentage for e in entries) / total
+    if len(insights) < 3 and total > 0:
         insights.append({
             "severity": "blue",
             "title": f"{total} answers graded so far",
@@ -237,9 +239,49 @@ def _generate_text_insights(
     return insights[:3]
 
 
+_writing_pool: ThreadPoolExecutor | None = None
+_writing_in_flight: set[int] = set()
+_writing_lock = threading.Lock()
+
+
 def _analyze_writing_style(text: str) -> None:
-    from extensions import EngineManager
+    """Update the current user's writing profile from an uploaded exam.
+
+    The analysis is an LLM round-trip the upload response does not need, so
+    with BACKGROUND_WORKERS set it runs on a worker thread; a user whose
+    previous analysis is still running is skipped.
+    """
+    global _writing_pool
+    uid = current_user_id()
+    workers = current_app.config.get("BACKGROUND_WORKERS", 0)
+    if not workers:
+        _update_writing_profile(uid, text)
+        return
+
+    with _writing_lock:
+        if uid in _writing_in_flight:
+            return
+        _writing_in_flight.add(uid)
+        if _writing_pool is None:
+            _writing_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="writing-style")
+    app = current_app._get_current_object()
+    _writing_pool.submit(_update_writing_profile_in_background, app, uid, text)
+
+
+def _update_writing_profile_in_background(app, uid: int, text: str) -> None:
+    try:
+        with app.app_context():
+            _update_writing_profile(uid, text)
+    except Exception:
+        app.logger.exception("Writing style analysis failed for user %s", uid)
+    finally:
+        with _writing_lock:
+            _writing_in_flight.discard(uid)
+
+
+def _update_writing_profile(uid: int, text: str) -> None:
     from db_stores import WritingProfileDB
+    from extensions import EngineManager
 
     engine = EngineManager.get_engine()
     prompt = f"""Analyze this student's writing from an IB exam. Identify:
@@ -265,7 +307,6 @@ Student's exam text:
 
     raw = engine.ask(prompt)
 
-    uid = current_user_id()
     wp_db = WritingProfileDB(uid)
     existing = wp_db.load()
 
@@ -311,19 +352,24 @@ def _last_active_date(activity_log) -> date:
 def generate_pending_notifications(user_id: int) -> list[Any]:
     """Check all notification triggers and create new notifications if needed."""
     from profile import Notification
+
     from db_stores import (
-        NotificationStoreDB, FlashcardDeckDB, ActivityLogDB,
-        GamificationProfileDB, StudyPlanDB,
+        ActivityLogDB,
+        FlashcardDeckDB,
+        GamificationProfileDB,
+        NotificationStoreDB,
+        StudyPlanDB,
     )
 
     store = NotificationStoreDB(user_id)
+    sent_today = store.types_today()
     new_notifications = []
     today = date.today().isoformat()
 
     # 1. Flashcards due
     fc_deck = FlashcardDeckDB(user_id)
     due_count = fc_deck.due_count()
-    if due_count > 0 and not store.has_today("flashcard_due"):
+    if due_count > 0 and "flashcard_due" not in sent_today:
         notif = Notification(
             id=f"fc_due_{today}",
             type="flashcard_due",
@@ -337,19 +383,18 @@ def generate_pending_notifications(user_id: int) -> list[Any]:
         new_notifications.append(notif)
 
     # 2. Streak at risk
-    activity_log = ActivityLogDB(user_id)
-    gam = GamificationProfileDB(user_id)
-    if gam.current_streak > 0:
-        active_dates = {e.date for e in activity_log.entries}
-        if today not in active_dates and not store.has_today("streak_risk"):
+    streak = GamificationProfileDB(user_id).current_streak
+    if streak > 0 and "streak_risk" not in sent_today:
+        # Days active since today's date: 0 means nothing logged yet today
+        if ActivityLogDB(user_id).days_active_last_n(0) == 0:
             notif = Notification(
                 id=f"streak_risk_{today}",
                 type="streak_risk",
-                title=f"Your {gam.current_streak}-day streak is at risk!",
+                title=f"Your {streak}-day streak is at risk!",
                 body="Study today to keep your streak alive.",
                 created_at=datetime.now().isoformat(),
                 action_url="/study",
-                data={"streak": gam.current_streak},
+                data={"streak": streak},
             )
             store.add(notif)
             new_notifications.append(notif)
@@ -360,7 +405,7 @@ def generate_pending_notifications(user_id: int) -> list[Any]:
         for dp in plan_data["daily_plans"]:
             if dp.date == today:
                 incomplete = sum(1 for t in dp.tasks if not t.completed)
-                if incomplete > 0 and not store.has_today("plan_reminder"):
+                if incomplete > 0 and "plan_reminder" not in sent_today:
                     notif = Notification(
                         id=f"plan_{today}",
                         type="plan_reminder",
@@ -13,16 +13,12 @@ All data persists to session_data/lifecycle.json.
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass, field, asdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
-from datetime import datetime
-
-import os
 
 SESSION_DIR = Path(__file__).parent / "session_data"
-if not os.environ.get("VERCEL"):
-    SESSION_DIR.mkdir(exist_ok=True)
 LIFECYCLE_PATH = SESSION_DIR / "lifecycle.json"
 
 
@@ -193,6 +189,7 @@ class IBLifecycle:
             "cas_reflections": [asdict(r) for r in self.cas_reflections],
             "cas_hours": self.cas_hours,
         }
+        SESSION_DIR.mkdir(exist_ok=True)
         LIFECYCLE_PATH.write_text(json.dumps(data, indent=2))
 
     @staticmethod
@@ -263,10 +260,7 @@ class IBLifecycle:
                 self.internal_assessments.append(InternalAssessment(
                     subject=subject,
                     milestones=[
-                        Milestone(f"ia_{_subject_key(subject)}_topic", "Topic chosen"),
-                        Milestone(f"ia_{_subject_key(subject)}_research", "Research complete"),
-                        Milestone(f"ia_{_subject_key(subject)}_draft", "First draft"),
-                        Milestone(f"ia_{_subject_key(subject)}_submit", "Submitted"),
+                        Milestone(mid, title) for mid, title in ia_milestones(subject)
                     ],
                 ))
         self.save()
@@ -298,14 +292,41 @@ class IBLifecycle:
         }
 
 
+# (suffix, title) for the default milestones of every Internal Assessment
+IA_MILESTONE_TEMPLATE = (
+    ("topic", "Topic chosen"),
+    ("research", "Research complete"),
+    ("draft", "First draft"),
+    ("submit", "Submitted"),
+)
+
+_SUBJECT_KEY_SANITIZE = str.maketrans({" ": "_", "&": ""})
+_SUBJECT_KEY_CACHE: dict[str, str] = {}
+
+
 def _subject_key(name: str) -> str:
-    return name.lower().split(":")[0].strip().replace(" ", "_").replace("&", "")
+    key = _SUBJECT_KEY_CACHE.get(name)
+    if key is None:
+        key = name.lower().split(":", 1)[0].strip().translate(_SUBJECT_KEY_SANITIZE)
+        _SUBJECT_KEY_CACHE[name] = key
+    return key
+
+
+def ia_milestones(subject: str) -> list[tuple[str, str]]:
+    """Default (id, title) milestone pairs for a subject's IA."""
+    key = _subject_key(subject)
+    return [(f"ia_{key}_{suffix}", title) for suffix, title in IA_MILESTONE_TEMPLATE]
 
 
 def _section_progress(milestones: list[Milestone]) -> dict:
     total = len(milestones)
-    completed = sum(1 for m in milestones if m.completed)
-    next_m = next((m for m in milestones if not m.completed), None)
+    completed = 0
+    next_m = None
+    for m in milestones:
+        if m.completed:
+            completed += 1
+        elif next_m is None:
+            next_m = m
     return {
         "total": total,
         "completed": completed,
@@ -21,11 +21,12 @@ class PgRow:
     """Dict-like row that mimics sqlite3.Row."""
 
     def __init__(self, columns: list[str], values: tuple):
-        self._data = dict(zip(columns, values))
+        self._values = tuple(values)
+        self._data = dict(zip(columns, self._values))
 
     def __getitem__(self, key: str | int) -> Any:
         if isinstance(key, int):
-            return list(self._data.values())[key]
+            return self._values[key]
         return self._data[key]
 
     def __contains__(self, key: str) -> bool:
@@ -62,8 +63,13 @@ def _translate_sql(sql: str) -> str:
     if "ON CONFLICT" not in translated.upper() and "INSERT INTO" in translated.upper():
         # Only add ON CONFLICT DO NOTHING for translated INSERT OR IGNORE
         if "INSERT OR IGNORE" in sql.upper():
-            # Find the VALUES(...) part and append ON CONFLICT DO NOTHING
-            translated = translated.rstrip().rstrip(";") + " ON CONFLICT DO NOTHING"
+            # Append ON CONFLICT DO NOTHING, ahead of any RETURNING clause
+            translated = translated.rstrip().rstrip(";")
+            head, sep, returning = translated.rpartition(" RETURNING ")
+            if sep:
+                translated = f"{head} ON CONFLICT DO NOTHING RETURNING {returning}"
+            else:
+                translated += " ON CONFLICT DO NOTHING"
 
     return translated
 
@@ -83,6 +89,9 @@ def _translate_schema(sql: str) -> str:
     # Remove SQLite-specific PRAGMAs
     translated = re.sub(r"PRAGMA\s+\w+\s*=\s*\w+\s*;?", "", translated, flags=re.IGNORECASE)
 
+    # WITHOUT ROWID is a SQLite storage hint; PostgreSQL tables have no rowid
+    translated = re.sub(r"\)\s*WITHOUT\s+ROWID", ")", translated, flags=re.IGNORECASE)
+
     # UNIQUE(col1, col2) constraints are the same in both
 
     return translated
@@ -146,6 +155,15 @@ class PgCursorWrapper:
             return PgRow(columns, row)
         return PgRow([], ())
 
+    def __iter__(self):
+        while True:
+            rows = self._cursor.fetchmany(100)
+            if not rows or not self._cursor.description:
+                return
+            columns = [desc[0] for desc in self._cursor.description]
+            for row in rows:
+                yield PgRow(columns, row)
+
     def fetchall(self) -> list[PgRow]:
         rows = self._cursor.fetchall()
         if not rows or not self._cursor.description:
@@ -170,6 +188,11 @@ class PgConnectionWrapper:
         cursor.execute(sql, params)
         return cursor
 
+    def executemany(self, sql: str, seq_of_params) -> PgCursorWrapper:
+        cursor = self._conn.cursor()
+        cursor.executemany(_translate_sql(sql), list(seq_of_params))
+        return PgCursorWrapper(cursor)
+
     def executescript(self, sql: str) -> None:
         """Execute multiple SQL statements (PostgreSQL equivalent)."""
         translated = _translate_schema(sql)
@@ -22,7 +22,7 @@ except ImportError:
     genai = None
 from dotenv import load_dotenv
 
-from subject_config import get_subject_config, get_syllabus_topics, SubjectConfig
+from subject_config import SubjectConfig, get_subject_config, get_syllabus_topics
 
 load_dotenv()
 
@@ -574,11 +574,17 @@ historical trends and clearly state it is an estimate."""
 
     # ── Generic Gemini call ────────────────────────────────────────
 
-    def ask(self, prompt: str, system: str = "") -> str:
-        """Simple wrapper for ad-hoc Gemini calls with resilience."""
+    def ask(self, prompt: str, system: str = "", cache_ttl: int = 0) -> str:
+        """Simple wrapper for ad-hoc Gemini calls with resilience.
+
+        With ``cache_ttl`` set, an identical (prompt, system) pair is answered
+        from the response cache for that many seconds.
+        """
         from ai_resilience import resilient_llm_call
 
-        text, _ = resilient_llm_call("gemini", "gemini-2.0-flash", prompt, system=system)
+        text, _ = resilient_llm_call(
+            "gemini", "gemini-2.0-flash", prompt, system=system, cache_ttl=cache_ttl,
+        )
         return text
 
 
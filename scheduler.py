@@ -5,6 +5,8 @@ Jobs:
   - Push study reminders (every 4 hours)
   - Daily analytics aggregation (2 AM)
   - TTL cache cleanup (every 1 hour)
+  - Leaderboard rankings refresh (every 5 minutes; on Vercel via
+    /api/cron/leaderboards, see vercel.json)
 """
 
 from __future__ import annotations
@@ -49,8 +51,9 @@ def init_scheduler(app):
     def _allocate_monthly_credits():
         with app.app_context():
             try:
+                from datetime import date, datetime
+
                 from database import get_db
-                from datetime import datetime, date
                 db = get_db()
                 today = date.today().isoformat()
                 # Find active subscribers whose last_allocation_date is not today
@@ -107,6 +110,25 @@ def init_scheduler(app):
         replace_existing=True,
     )
 
+    # 5. Leaderboard rankings — every 5 minutes, first run at startup
+    def _refresh_leaderboards():
+        with app.app_context():
+            try:
+                from db_stores import LeaderboardStoreDB
+                LeaderboardStoreDB.refresh()
+            except Exception as e:
+                app.logger.error("Leaderboard refresh failed: %s", e)
+
+    from datetime import datetime
+    scheduler.add_job(
+        func=_refresh_leaderboards,
+        trigger="interval",
+        minutes=5,
+        next_run_time=datetime.now(),
+        id="leaderboard_refresh",
+        replace_existing=True,
+    )
+
     scheduler.start()
-    app.logger.info("Centralized scheduler started (reminders, analytics, cache cleanup)")
+    app.logger.info("Centralized scheduler started (reminders, analytics, cache cleanup, leaderboards)")
     return scheduler
@@ -11,14 +11,13 @@ from ai_resilience import (
     CircuitBreaker,
     CostTracker,
     PromptVariantSelector,
-    TTLCache,
     TransientLLMError,
+    TTLCache,
     get_cache,
     get_circuit_breaker,
     resilient_llm_call,
 )
 
-
 # ── TTLCache Tests ──────────────────────────────────────────
 
 
@@ -32,6 +32,16 @@ class TestCreditStore:
             assert result["success"] is True
             assert result["balance_after"] == 150
 
+    def test_uncommitted_debit_rolls_back(self, app):
+        with app.app_context():
+            from credit_store import CreditStoreDB
+            from database import get_db
+            store = CreditStoreDB(1)
+            store.credit(200, "purchase", "Setup")
+            assert store.debit(50, "oral_practice", commit=False)["success"] is True
+            get_db().rollback()
+            assert store.balance() == 200
+
     def test_debit_insufficient_funds(self, app):
         with app.app_context():
             from credit_store import CreditStoreDB
@@ -174,8 +184,8 @@ class TestSubscriptionStore:
 
     def test_upgrade_allocates_credits(self, app):
         with app.app_context():
-            from subscription_store import SubscriptionStoreDB
             from credit_store import CreditStoreDB
+            from subscription_store import SubscriptionStoreDB
             sub = SubscriptionStoreDB(1)
             credits = CreditStoreDB(1)
             initial = credits.balance()
@@ -1,7 +1,9 @@
 """Tests for database.py — schema creation, foreign keys, basic operations."""
 
 import json
+
 import pytest
+
 from database import get_db, init_db
 
 
@@ -37,6 +39,72 @@ class TestSchema:
             fk = db.execute("PRAGMA foreign_keys").fetchone()[0]
             assert fk == 1
 
+    def test_write_pragmas(self, app):
+        with app.app_context():
+            db = get_db()
+            assert db.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert db.execute("PRAGMA temp_store").fetchone()[0] == 2   # MEMORY
+
+    def test_migrations_gather_planner_stats(self, app):
+        with app.app_context():
+            db = get_db()
+            assert db.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            ).fetchone()
+
+    def test_connections_pooled_per_process(self, app):
+        import database
+        app.config["SQLITE_POOL_SIZE"] = 2
+        try:
+            with app.app_context():
+                first = get_db()
+                first.execute("UPDATE users SET name = 'Uncommitted' WHERE id = 1")
+            with app.app_context():
+                db = get_db()
+                assert db is first
+                # Work left uncommitted by the previous request is rolled back
+                assert db.execute("SELECT name FROM users WHERE id = 1").fetchone()[0] == "Test Student"
+        finally:
+            app.config["SQLITE_POOL_SIZE"] = 0
+            for pool in database._sqlite_pools.values():
+                while not pool.empty():
+                    pool.get_nowait().close()
+            database._sqlite_pools.clear()
+
+    def test_badge_backfill_reads_legacy_json(self, app):
+        from database import _backfill_user_badges
+        with app.app_context():
+            db = get_db()
+            db.execute("DELETE FROM user_badges")
+            db.execute(
+                "UPDATE gamification SET badges = ? WHERE user_id = 1",
+                (json.dumps(["streak_7", "first_question"]),),
+            )
+            _backfill_user_badges(db)
+            _backfill_user_badges(db)  # idempotent
+            db.commit()
+            rows = db.execute(
+                "SELECT badge_id FROM user_badges WHERE user_id = 1 ORDER BY badge_id"
+            ).fetchall()
+            assert [r["badge_id"] for r in rows] == ["first_question", "streak_7"]
+
+    def test_study_buddy_backfill_reads_preferences_json(self, app):
+        from database import _backfill_study_buddy_subjects
+        with app.app_context():
+            db = get_db()
+            db.execute(
+                "INSERT INTO study_buddy_preferences (user_id, subjects, updated_at) "
+                "VALUES (1, ?, '2026-01-01')",
+                (json.dumps(["Biology", "Chemistry", "Biology"]),),
+            )
+            _backfill_study_buddy_subjects(db)
+            _backfill_study_buddy_subjects(db)  # idempotent
+            db.commit()
+            rows = db.execute(
+                "SELECT subject FROM study_buddy_subjects WHERE user_id = 1 ORDER BY subject"
+            ).fetchall()
+            assert [r["subject"] for r in rows] == ["Biology", "Chemistry"]
+
     def test_seed_user_exists(self, db):
         row = db.execute("SELECT * FROM users WHERE id=1").fetchone()
         assert row is not None
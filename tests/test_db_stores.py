@@ -1,36 +1,37 @@
 """Tests for db_stores.py — CRUD for all DB-backed store classes."""
 
 import json
-import pytest
 from datetime import date, timedelta
+from profile import (
+    DailyPlan,
+    Flashcard,
+    GradeDetailEntry,
+    MockExamReport,
+    Notification,
+    StudyTask,
+    SubjectEntry,
+)
+
+import pytest
 
 from db_stores import (
-    StudentProfileDB,
-    GradeDetailLogDB,
-    TopicProgressStoreDB,
     ActivityLogDB,
-    ReviewScheduleDB,
-    GamificationProfileDB,
     FlashcardDeckDB,
+    GamificationProfileDB,
+    GradeDetailLogDB,
+    GradeHistoryDB,
+    IBLifecycleDB,
     MisconceptionLogDB,
     MockExamReportStoreDB,
     NotificationStoreDB,
+    ParentConfigDB,
+    ReviewScheduleDB,
     SharedQuestionStoreDB,
+    StudentProfileDB,
     StudyPlanDB,
-    WritingProfileDB,
-    ParentConfigDB,
-    IBLifecycleDB,
-    GradeHistoryDB,
+    TopicProgressStoreDB,
     UploadStoreDB,
-)
-from profile import (
-    SubjectEntry,
-    GradeDetailEntry,
-    Flashcard,
-    Notification,
-    MockExamReport,
-    StudyTask,
-    DailyPlan,
+    WritingProfileDB,
 )
 from lifecycle import CASReflection
 
@@ -124,6 +125,16 @@ class TestGradeDetailLogDB:
             recent = gl.recent(2)
             assert len(recent) == 2
 
+    def test_percentage_summary_matches_entries(self, app, seeded_grades):
+        with app.app_context():
+            gl = GradeDetailLogDB(1)
+            pcts = [e.percentage for e in gl.entries]
+            total, avg, latest = gl.percentage_summary(2)
+            assert total == len(pcts)
+            assert avg == pytest.approx(sum(pcts) / len(pcts))
+            assert latest == pcts[-2:]
+            assert GradeDetailLogDB(999).percentage_summary() == (0, 0.0, [])
+
 
 class TestActivityLogDB:
     def test_record_and_streak(self, app):
@@ -191,6 +202,14 @@ class TestGamificationProfileDB:
             new = gam.check_badges()
             assert "first_question" in new
 
+    def test_check_badges_awards_once(self, app):
+        with app.app_context():
+            gam = GamificationProfileDB(1)
+            gam.total_questions_answered = 1
+            assert "first_question" in gam.check_badges()
+            assert "first_question" not in gam.check_badges()
+            assert gam.badges.count("first_question") == 1
+
 
 class TestFlashcardDeckDB:
     def test_add_and_retrieve(self, app):
@@ -271,6 +290,57 @@ class TestNotificationStoreDB:
                 if n.id == "test_notif_2":
                     assert n.read is True
 
+    def test_unread_counter_tracks_changes(self, app):
+        with app.app_context():
+            ns = NotificationStoreDB(1)
+            for i in range(3):
+                ns.add(Notification(
+                    id=f"cnt_{i}", type="test", title="T", body="B",
+                    created_at="2026-02-16T10:00:00",
+                ))
+            assert ns.unread_count() == 3
+            ns.mark_read("cnt_0")
+            ns.mark_read("cnt_0")
+            ns.dismiss("cnt_1")
+            assert ns.unread_count() == 1
+            ns.mark_all_read()
+            assert ns.unread_count() == 0
+
+    def test_pending_notifications_once_per_day(self, app):
+        with app.app_context():
+            from datetime import datetime
+
+            from helpers import generate_pending_notifications
+            ns = NotificationStoreDB(1)
+            ns.add(Notification(
+                id="old_fc", type="flashcard_due", title="T", body="B",
+                created_at="2020-01-01T10:00:00",
+            ))
+            ns.add(Notification(
+                id="today_plan", type="plan_reminder", title="T", body="B",
+                created_at=datetime.now().isoformat(),
+            ))
+            assert ns.types_today() == {"plan_reminder"}
+
+            generate_pending_notifications(1)
+            sent = ns.types_today()
+            assert generate_pending_notifications(1) == []
+            assert ns.types_today() == sent
+
+
+class TestSharedQuestionStoreDB:
+    def test_to_json_round_trip(self, app):
+        with app.app_context():
+            store = SharedQuestionStoreDB(1)
+            questions = [{"question": "Define osmosis", "marks": 2}]
+            qset = store.export_set("Cells", "Set", "Biology", "Cells", "HL",
+                                    questions, "Test Student")
+            data = json.loads(store.to_json(qset.id))
+            assert data["id"] == qset.id
+            assert data["questions"] == questions
+            assert data["import_count"] == 0
+            assert store.to_json("missing") == ""
+
 
 class TestStudyPlanDB:
     def test_save_and_load(self, app):
@@ -286,6 +356,19 @@ class TestStudyPlanDB:
             assert len(loaded["daily_plans"]) == 1
             assert len(loaded["daily_plans"][0].tasks) == 1
 
+    def test_update_task_toggles(self, app):
+        with app.app_context():
+            sp = StudyPlanDB(1)
+            today = date.today().isoformat()
+            tasks = [StudyTask("Biology", "Cells", "practice", 60, "high")]
+            sp.save("2026-02-16", "2026-05-01", [DailyPlan(date=today, tasks=tasks, estimated_minutes=60)])
+
+            assert sp.update_task(today, 0) is True
+            assert sp.load()["daily_plans"][0].tasks[0].completed is True
+            assert sp.update_task(today, 0) is False
+            assert sp.update_task(today, 5) is None
+            assert sp.update_task("1999-01-01", 0) is None
+
 
 class TestWritingProfileDB:
     def test_save_and_load(self, app):
@@ -330,9 +413,25 @@ class TestIBLifecycleDB:
             lc.init_from_profile(["Biology", "Chemistry", "Mathematics: AA"])
             ias = lc.internal_assessments
             assert len(ias) >= 3
+            bio = [ia for ia in ias if ia.subject == "Biology"][0]
+            assert [m.id for m in bio.milestones] == [
+                "ia_biology_topic", "ia_biology_research",
+                "ia_biology_draft", "ia_biology_submit",
+            ]
             # EE and TOK milestones should exist
             assert lc.total_milestones() > 0
 
+    def test_get_ia_for_subject(self, app):
+        with app.app_context():
+            lc = IBLifecycleDB(1)
+            lc.init_from_profile(["Biology", "Chemistry"])
+            lc.update_ia("Chemistry", title="Rates", word_count=1200)
+            ia = lc.get_ia_for_subject("Chemistry")
+            assert ia.title == "Rates"
+            assert ia.word_count == 1200
+            assert ia.milestones[0].id == "ia_chemistry_topic"
+            assert lc.get_ia_for_subject("Physics") is None
+
     def test_toggle_milestone(self, app):
         with app.app_context():
             lc = IBLifecycleDB(1)
@@ -342,8 +441,13 @@ class TestIBLifecycleDB:
                 mid = ee.milestones[0].id
                 new_state = lc.toggle_milestone(mid)
                 assert new_state is True
+                total, done = lc.milestone_counts()
+                assert done == 1 and total == lc.total_milestones()
+                assert lc.extended_essay.milestones[0].completed_date
                 new_state2 = lc.toggle_milestone(mid)
                 assert new_state2 is False
+                assert lc.extended_essay.milestones[0].completed_date == ""
+            assert lc.toggle_milestone("missing") is False
 
     def test_add_cas_reflection(self, app):
         with app.app_context():
@@ -356,6 +460,8 @@ class TestIBLifecycleDB:
             lc.add_cas_reflection(reflection)
             assert len(lc.cas_reflections) >= 1
             assert lc.cas_hours["Creativity"] >= 5.0
+            assert lc.cas_hours["Service"] == 0.0
+            assert lc.summary()["cas_reflections_count"] == len(lc.cas_reflections)
 
     def test_summary(self, app):
         with app.app_context():
@@ -365,6 +471,17 @@ class TestIBLifecycleDB:
             assert "total_milestones" in s
             assert "cas_hours" in s
 
+    def test_summary_section_progress(self, app):
+        with app.app_context():
+            lc = IBLifecycleDB(1)
+            lc.init_from_profile(["Biology"])
+            lc.toggle_milestone("ia_biology_research")
+            s = lc.summary()
+            assert s["completed_milestones"] == 1
+            progress = s["ia_summaries"][0]["progress"]
+            assert progress == {"total": 4, "completed": 1, "pct": 25, "next": "Topic chosen"}
+            assert s["ee_progress"]["next"] == "Topic approved"
+
 
 class TestGradeHistoryDB:
     def test_append_and_retrieve(self, app):
@@ -383,6 +500,53 @@ class TestGradeHistoryDB:
             assert len(history) >= 1
             assert history[-1]["question"] == "What is DNA?"
 
+            scores = gh.scores()
+            assert scores[-1]["question"] == "What is DNA?"
+            assert scores[-1]["percentage"] == 75
+            assert "raw_response" not in scores[-1]
+
+    def test_recent_improvements_latest_oldest_first(self, app):
+        with app.app_context():
+            from grader import GradeResult
+            gh = GradeHistoryDB(1)
+            for i in range(25):
+                gh.append(GradeResult(
+                    question=f"Q{i}", answer="A", mark_earned=1, mark_total=2, grade=4,
+                    percentage=50, strengths=[], improvements=[f"imp {i}"],
+                    examiner_tip="", full_commentary="", raw_response="",
+                ))
+            recent = gh.recent_improvements(20)
+            assert recent == [[f"imp {i}"] for i in range(5, 25)]
+            from database import get_db
+            plan = " ".join(r["detail"] for r in get_db().execute(
+                "EXPLAIN QUERY PLAN SELECT improvements FROM grade_history "
+                "WHERE user_id=? ORDER BY id DESC LIMIT ?", (1, 20)))
+            assert "idx_grade_history_user" in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_grader_analytics_moving_average(self, app):
+        with app.app_context():
+            from grader import GradeResult, IBGrader
+            grader = IBGrader(None, user_id=1)
+            before = len(grader._db.scores())
+            pcts = [40, 50, 60, 70, 80, 90, 100, 30, 20, 10, 55, 65]
+            for pct in pcts:
+                grader._db.append(GradeResult(
+                    question="Q", answer="A", mark_earned=1, mark_total=2,
+                    grade=pct // 15 + 1, percentage=pct, strengths=[], improvements=[],
+                    examiner_tip="", full_commentary="", raw_response="",
+                ))
+            analytics = grader.get_analytics()
+            all_pcts = [s["percentage"] for s in grader._db.scores()]
+            window = min(10, len(all_pcts))
+            expected = [
+                round(sum(all_pcts[max(0, i - window + 1):i + 1]) / min(i + 1, window), 1)
+                for i in range(len(all_pcts))
+            ]
+            assert analytics["total_answers"] == before + len(pcts)
+            assert analytics["trend"] == expected
+            assert sum(analytics["grade_distribution"].values()) == len(all_pcts)
+
 
 class TestUploadStoreDB:
     def test_add_and_load(self, app):
@@ -410,3 +574,43 @@ class TestUploadStoreDB:
             result = us.delete("upload_del")
             assert result is not None
             assert us.delete("nonexistent") is None
+
+
+class TestMembershipJoins:
+    def test_class_join_once(self, app, teacher_client):
+        with app.app_context():
+            from db_stores import ClassStoreDB
+            ClassStoreDB.leave(1, 1)
+            assert ClassStoreDB.join(1, 1) is True
+            assert ClassStoreDB.join(1, 1) is False
+
+    def test_group_join_respects_capacity(self, app, teacher_client):
+        with app.app_context():
+            from db_stores import StudyGroupStoreDB
+            group = StudyGroupStoreDB.create("Pair", created_by=1, max_members=2)
+            assert StudyGroupStoreDB.join(group["id"], 1) is False
+            assert StudyGroupStoreDB.join(group["id"], 2) is True
+            assert StudyGroupStoreDB.join(group["id"], 2) is False
+
+            solo = StudyGroupStoreDB.create("Solo", created_by=1, max_members=1)
+            assert StudyGroupStoreDB.join(solo["id"], 2) is False
+            assert StudyGroupStoreDB.join(99999, 2) is False
+
+
+class TestSharedFlashcardDeckDB:
+    def test_import_deck(self, app):
+        with app.app_context():
+            from db_stores import SharedFlashcardDeckDB
+            deck_id = SharedFlashcardDeckDB.share(
+                1, "Cells", "Biology", topic="Organelles",
+                cards=[{"front": "Mitochondria", "back": "ATP"}, {"front": "Ribosome"}],
+            )
+            assert SharedFlashcardDeckDB.import_deck(deck_id, 1) == 2
+            assert SharedFlashcardDeckDB.import_deck(9999, 1) == 0
+            cards = [c for c in FlashcardDeckDB(1).cards if c.subject == "Biology"]
+            assert {c.front for c in cards} >= {"Mitochondria", "Ribosome"}
+
+    def test_stored_json_decodes_stdlib_extensions(self):
+        from db_stores import _loads
+        assert _loads('[{"front": "a"}]') == [{"front": "a"}]
+        assert _loads('[NaN]')[0] != _loads('[NaN]')[0]  # NaN, as json.dumps writes it
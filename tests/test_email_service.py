@@ -0,0 +1,58 @@
+"""Tests for the SMTP transport of EmailService."""
+
+from __future__ import annotations
+
+import smtplib
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import email_service
+from email_service import EmailService
+
+CONFIG = {"mail_server": "smtp.test", "mail_port": 587,
+          "mail_username": "user", "mail_password": "pw"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_session():
+    email_service._session().close()
+    yield
+    email_service._session().close()
+
+
+class TestSMTPSessionReuse:
+    def test_session_reused_across_sends(self):
+        smtp = MagicMock()
+        smtp.noop.return_value = (250, b"OK")
+        with patch("email_service.smtplib.SMTP", return_value=smtp) as factory:
+            assert EmailService._do_send("a@test.com", "Hi", "<p>1</p>", CONFIG)
+            assert EmailService._do_send("b@test.com", "Hi", "<p>2</p>", CONFIG)
+        factory.assert_called_once_with("smtp.test", 587)
+        smtp.login.assert_called_once_with("user", "pw")
+        assert smtp.send_message.call_count == 2
+
+    def test_reconnects_after_server_disconnect(self):
+        stale, fresh = MagicMock(), MagicMock()
+        stale.noop.return_value = (250, b"OK")
+        stale.send_message.side_effect = [None, smtplib.SMTPServerDisconnected()]
+        with patch("email_service.smtplib.SMTP", side_effect=[stale, fresh]):
+            assert EmailService._do_send("a@test.com", "Hi", "<p>1</p>", CONFIG)
+            assert EmailService._do_send("b@test.com", "Hi", "<p>2</p>", CONFIG)
+        fresh.send_message.assert_called_once()
+
+    def test_failure_returns_false(self):
+        with patch("email_service.smtplib.SMTP", side_effect=OSError("refused")):
+            assert EmailService._do_send("a@test.com", "Hi", "<p>1</p>", CONFIG) is False
+
+    def test_idle_session_closed_by_reaper(self, monkeypatch):
+        smtp = MagicMock()
+        with patch("email_service.smtplib.SMTP", return_value=smtp):
+            assert EmailService._do_send("a@test.com", "Hi", "<p>1</p>", CONFIG)
+        email_service._reap_idle()
+        smtp.quit.assert_not_called()
+
+        monkeypatch.setattr(email_service, "SMTP_IDLE_TIMEOUT", 0)
+        email_service._reap_idle()
+        smtp.quit.assert_called_once()
+        assert email_service._session().smtp is None
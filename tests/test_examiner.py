@@ -1,9 +1,10 @@
 """Tests for examiner review pipeline UI endpoints."""
 
 import json
-import pytest
 from datetime import datetime
 
+import pytest
+
 
 class TestExaminerDashboard:
     def test_examiner_dashboard_loads(self, teacher_client):
@@ -73,3 +74,56 @@ class TestExaminerReviewFlow:
             content_type="application/json",
         )
         assert resp.status_code == 200
+
+    def test_deliver_notifies_student(self, app):
+        from examiner_pipeline import ExaminerPipeline
+        with app.app_context():
+            from database import get_db
+            db = get_db()
+            cur = db.execute(
+                "INSERT INTO examiner_reviews "
+                "(user_id, doc_type, subject, title, submission_text, status, submitted_at) "
+                "VALUES (1, 'ia', 'Biology', 'Test IA', 'Text', 'reviewed', ?)",
+                (datetime.now().isoformat(),),
+            )
+            db.commit()
+            ExaminerPipeline.deliver_to_student(cur.lastrowid)
+            ExaminerPipeline.deliver_to_student(9999)  # unknown id is a no-op
+
+            assert ExaminerPipeline.get_review(cur.lastrowid)["status"] == "delivered"
+            notif = db.execute(
+                "SELECT title, action_url FROM notifications WHERE user_id = 1 AND type = 'review_delivered'"
+            ).fetchone()
+            assert notif["title"] == "Your IA review is ready!"
+            assert notif["action_url"] == f"/reviews/{cur.lastrowid}"
+
+
+class TestDiagnosticCache:
+    def test_resubmission_reuses_agent_review(self, app):
+        from unittest.mock import patch
+
+        from examiner_pipeline import ExaminerPipeline
+        review = {"ai_review": "Solid method", "predicted_grade": "6"}
+        with app.app_context(), patch.object(
+            ExaminerPipeline, "_agent_review", return_value=review,
+        ) as agent:
+            pipeline = ExaminerPipeline()
+            first = pipeline.generate_ai_diagnostic("My IA on osmosis.", "ia", "biology")
+            again = pipeline.generate_ai_diagnostic("My IA on osmosis.\n", "ia", "biology")
+            pipeline.generate_ai_diagnostic("My IA on osmosis.", "ee", "biology")
+        assert agent.call_count == 2
+        assert first == again
+        assert again["predicted_grade"] == "6"
+
+    def test_agent_failure_not_cached(self, app):
+        from unittest.mock import patch
+
+        from examiner_pipeline import ExaminerPipeline
+        with app.app_context(), patch.object(
+            ExaminerPipeline, "_agent_review", side_effect=RuntimeError("down"),
+        ) as agent:
+            pipeline = ExaminerPipeline()
+            for _ in range(2):
+                diagnostic = pipeline.generate_ai_diagnostic("Draft", "ia", "biology")
+                assert diagnostic["ai_review"] == "AI review unavailable"
+        assert agent.call_count == 2
@@ -0,0 +1,39 @@
+"""Tests for grader.py — context building and response caching."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+
+class TestGraderContext:
+    def test_compact_context_dedupes_and_caps(self):
+        from grader import _compact_context
+        from rag_engine import RetrievedChunk
+
+        def chunk(text):
+            return RetrievedChunk(text=text, source="", doc_type="", subject="", level="", distance=0.1)
+
+        chunks = [chunk("Award 1 mark  for osmosis"), chunk("Award 1 mark for osmosis"),
+                  chunk("B" * 30), chunk("C" * 5)]
+        assert _compact_context(chunks, 40) == "Award 1 mark  for osmosis\n---\nCCCCC"
+        assert _compact_context([chunk("A" * 50)], 40) == "A" * 40
+        assert _compact_context([], 40) == ""
+
+
+class TestGraderResponseCache:
+    @patch("ai_resilience._call_with_retry")
+    def test_identical_submission_graded_once(self, mock_retry, app):
+        from grader import IBGrader
+        from rag_engine import RAGEngine
+
+        mock_retry.return_value = "MARK: 3/4\nGRADE: 6\nPERCENTAGE: 75%"
+        engine = RAGEngine()
+        with app.app_context(), patch.object(RAGEngine, "query", return_value=[]):
+            grader = IBGrader(engine, user_id=1)
+            first = grader.grade("Define osmosis.", "Water moves...", "biology", 4, "Define")
+            second = grader.grade("Define osmosis.", "Water moves...", "biology", 4, "Define")
+            grader.grade("Define osmosis.", "Solutes move...", "biology", 4, "Define")
+            assert len(grader.history) == 3  # cached grades are still recorded
+
+        assert mock_retry.call_count == 2
+        assert (first.mark_earned, second.mark_earned) == (3, 3)
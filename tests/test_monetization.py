@@ -13,10 +13,10 @@ Covers all 7 systems:
 from __future__ import annotations
 
 import json
-import pytest
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
+import pytest
 
 # ═══════════════════════════════════════════════════════════════════
 # System 1: Credit/Token Economy
@@ -148,8 +148,8 @@ class TestSubscriptionStoreDB:
 
     def test_upgrade_allocates_credits(self, app):
         with app.app_context():
-            from subscription_store import SubscriptionStoreDB
             from credit_store import CreditStoreDB
+            from subscription_store import SubscriptionStoreDB
             store = SubscriptionStoreDB(1)
             store.upgrade("explorer")
             credits = CreditStoreDB(1)
@@ -287,8 +287,8 @@ class TestSOSDetector:
 
     def test_request_session_with_credits(self, app, seeded_failing_grades):
         with app.app_context():
-            from sos_detector import SOSDetector
             from credit_store import CreditStoreDB
+            from sos_detector import SOSDetector
             CreditStoreDB(1).credit(500, "purchase")
             detector = SOSDetector(1)
             alerts = detector.check_for_sos()
@@ -298,9 +298,9 @@ class TestSOSDetector:
 
     def test_complete_session(self, app, seeded_failing_grades):
         with app.app_context():
-            from sos_detector import SOSDetector
             from credit_store import CreditStoreDB
             from database import get_db
+            from sos_detector import SOSDetector
             CreditStoreDB(1).credit(500, "purchase")
             detector = SOSDetector(1)
             alerts = detector.check_for_sos()
@@ -359,8 +359,8 @@ class TestExaminerPipeline:
 
     def test_submit_for_review_with_credits(self, app):
         with app.app_context():
-            from examiner_pipeline import ExaminerPipeline
             from credit_store import CreditStoreDB
+            from examiner_pipeline import ExaminerPipeline
             CreditStoreDB(1).credit(1000, "purchase")
             pipeline = ExaminerPipeline()
             result = pipeline.submit_for_review(
@@ -373,9 +373,9 @@ class TestExaminerPipeline:
 
     def test_assign_to_examiner(self, app):
         with app.app_context():
-            from examiner_pipeline import ExaminerPipeline
             from credit_store import CreditStoreDB
             from database import get_db
+            from examiner_pipeline import ExaminerPipeline
             CreditStoreDB(1).credit(1000, "purchase")
 
             # Create teacher
@@ -398,9 +398,9 @@ class TestExaminerPipeline:
 
     def test_complete_review(self, app):
         with app.app_context():
-            from examiner_pipeline import ExaminerPipeline
             from credit_store import CreditStoreDB
             from database import get_db
+            from examiner_pipeline import ExaminerPipeline
             CreditStoreDB(1).credit(1000, "purchase")
 
             db = get_db()
@@ -425,8 +425,8 @@ class TestExaminerPipeline:
 
     def test_deliver_to_student(self, app):
         with app.app_context():
-            from examiner_pipeline import ExaminerPipeline
             from credit_store import CreditStoreDB
+            from examiner_pipeline import ExaminerPipeline
             CreditStoreDB(1).credit(1000, "purchase")
 
             pipeline = ExaminerPipeline()
@@ -442,8 +442,8 @@ class TestExaminerPipeline:
 
     def test_student_reviews(self, app):
         with app.app_context():
-            from examiner_pipeline import ExaminerPipeline
             from credit_store import CreditStoreDB
+            from examiner_pipeline import ExaminerPipeline
             CreditStoreDB(1).credit(2000, "purchase")
 
             pipeline = ExaminerPipeline()
@@ -454,8 +454,8 @@ class TestExaminerPipeline:
 
     def test_pending_reviews(self, app):
         with app.app_context():
-            from examiner_pipeline import ExaminerPipeline
             from credit_store import CreditStoreDB
+            from examiner_pipeline import ExaminerPipeline
             CreditStoreDB(1).credit(1000, "purchase")
 
             pipeline = ExaminerPipeline()
@@ -527,6 +527,23 @@ class TestBatchGradingAgent:
             assert result["risk_level"] in ("medium", "high")
             assert len(result["signals"]) > 0
 
+    def test_process_batch_keeps_submission_order(self, app):
+        with app.app_context():
+            from unittest.mock import patch
+
+            from agents.batch_grading_agent import BatchGradingAgent
+            agent = BatchGradingAgent()
+            agent._provider = "gemini"
+            subs = [{"student_id": i, "student_name": f"S{i}", "text": "x"} for i in range(6)]
+            with patch.object(
+                BatchGradingAgent, "_grade_single",
+                side_effect=lambda sub, subject, doc_type: {"grade": sub["student_id"] % 7 + 1},
+            ):
+                result = agent.process_batch(subs, "Biology")
+            graded = result.metadata["results"]
+            assert [r["student_id"] for r in graded] == list(range(6))
+            assert [r["grade"] for r in graded] == [1, 2, 3, 4, 5, 6]
+
 
 # ═══════════════════════════════════════════════════════════════════
 # System 6: Enhanced Parent Portal
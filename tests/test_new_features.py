@@ -5,6 +5,7 @@ teacher dashboard, exam sessions, tutor conversations, push subscriptions.
 from __future__ import annotations
 
 import json
+
 import pytest
 
 
@@ -127,6 +128,22 @@ class TestPushSubscription:
         }), content_type="application/json")
         assert res.get_json()["success"]
 
+    def test_resubscribe_updates_in_place(self, app, auth_client):
+        for key in ("old", "new"):
+            auth_client.post("/api/push/subscribe", data=json.dumps({
+                "subscription": {"endpoint": "https://example.com/push/789",
+                                 "keys": {"p256dh": key, "auth": "a"}},
+            }), content_type="application/json")
+        with app.app_context():
+            from database import get_db
+            rows = get_db().execute(
+                "SELECT id, p256dh FROM push_subscriptions WHERE endpoint = ?",
+                ("https://example.com/push/789",),
+            ).fetchall()
+            assert len(rows) == 1
+            assert rows[0]["id"] == 1  # row kept, not deleted and re-inserted
+            assert rows[0]["p256dh"] == "new"
+
     def test_unsubscribe(self, auth_client):
         # Subscribe first
         auth_client.post("/api/push/subscribe", data=json.dumps({
@@ -194,6 +211,7 @@ class TestTeacherDashboard:
     def teacher_client(self, app):
         """Create an authenticated client with teacher role."""
         from werkzeug.security import generate_password_hash
+
         from database import get_db
 
         with app.app_context():
@@ -297,6 +315,38 @@ class TestExamSimulation:
             assert ExamPaperGenerator.calculate_grade("Biology", "HL", 100, 35) in (2, 3)
             assert ExamPaperGenerator.calculate_grade("Biology", "HL", 100, 10) == 1
 
+    def test_paper_spec_from_assessment_components(self):
+        from exam_simulation import _paper_spec
+        assert _paper_spec("Biology", "HL", 2) == (150, 90)
+        assert _paper_spec("Biology", "SL", 1) == (90, 55)
+        assert _paper_spec("Biology", "HL", 9) == (90, 60)
+        assert _paper_spec("Not A Subject", "HL", 1) == (90, 60)
+
+    def test_parse_generated_paper(self):
+        from exam_simulation import _parse_questions
+        text = (
+            "SECTION: A\n"
+            "QUESTION_NUMBER: 1\n"
+            "QUESTION: Outline the structure of a eukaryotic cell membrane.\n"
+            "MARKS: [4 marks]\n"
+            "COMMAND_TERM: Outline\n"
+            "---\n"
+            "  QUESTION: Too short.\n"
+            "---\n"
+            "SECTION: B\n"
+            "QUESTION_NUMBER: two\n"
+            "QUESTION: Evaluate the role of enzymes in cellular respiration.  \n"
+            "MARKS: many\n"
+            "---"
+        )
+        questions = _parse_questions(text)
+        assert questions == [
+            {"number": 1, "question_text": "Outline the structure of a eukaryotic cell membrane.",
+             "section": "A", "marks": 4, "command_term": "Outline"},
+            {"number": 2, "question_text": "Evaluate the role of enzymes in cellular respiration.",
+             "section": "B", "marks": 4, "command_term": ""},
+        ]
+
 
 class TestAITutor:
     """Step 11: AI Tutor"""
@@ -383,6 +433,7 @@ class TestTeacherAnalytics:
     @pytest.fixture(autouse=False)
     def teacher_client(self, app):
         from werkzeug.security import generate_password_hash
+
         from database import get_db
         with app.app_context():
             db = get_db()
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+
 import pytest
 
 
@@ -42,8 +43,8 @@ class TestCacheBackendIntegration:
     def test_leaderboard_cache(self, app, db):
         """Leaderboard results should be cached on second call."""
         with app.app_context():
-            from db_stores import LeaderboardStoreDB
             from cache_backend import get_cache
+            from db_stores import LeaderboardStoreDB
 
             # First call — populates cache
             result1 = LeaderboardStoreDB.get("global")
@@ -51,6 +52,107 @@ class TestCacheBackendIntegration:
             result2 = LeaderboardStoreDB.get("global")
             assert result1 == result2
 
+    def test_community_papers_cache_invalidated_by_writes(self, app, db):
+        with app.app_context():
+            from database import get_db
+            from db_stores import CommunityPaperStoreDB
+            pid = CommunityPaperStoreDB.create(1, "Paper 1", subject="Biology")
+            assert CommunityPaperStoreDB.list_papers(subject="Biology") == []
+
+            # Direct writes are hidden by the cache until a store write bumps it
+            get_db().execute("UPDATE community_papers SET title = 'Renamed' WHERE id = ?", (pid,))
+            get_db().commit()
+            CommunityPaperStoreDB.approve(pid)
+            papers = CommunityPaperStoreDB.list_papers(subject="Biology")
+            assert [p["title"] for p in papers] == ["Renamed"]
+
+            CommunityPaperStoreDB.rate(pid, 1, 4)
+            assert CommunityPaperStoreDB.list_papers(subject="Biology")[0]["avg_rating"] == 4
+
+    def test_paper_rating_totals_maintained(self, app, db):
+        with app.app_context():
+            from database import get_db
+            from db_stores import CommunityPaperStoreDB
+            pid = CommunityPaperStoreDB.create(1, "Paper 1", subject="Biology")
+            CommunityPaperStoreDB.approve(pid)
+
+            def totals():
+                return tuple(get_db().execute(
+                    "SELECT rating_sum, rating_count FROM community_papers WHERE id = ?", (pid,)
+                ).fetchone())
+
+            CommunityPaperStoreDB.rate(pid, 1, 4)
+            CommunityPaperStoreDB.rate(pid, 1, 2)  # re-rating replaces, not adds
+            assert totals() == (2, 1)
+            assert CommunityPaperStoreDB.list_papers(subject="Biology")[0]["avg_rating"] == 2
+
+            get_db().execute("DELETE FROM paper_ratings WHERE paper_id = ?", (pid,))
+            get_db().commit()
+            assert totals() == (0, 0)
+
+    def test_paper_downloads_coalesced(self, app, db):
+        with app.app_context():
+            from database import get_db
+            from db_stores import CommunityPaperStoreDB, _paper_downloads
+            pid = CommunityPaperStoreDB.create(1, "Paper 1", subject="Biology")
+
+            def count():
+                return get_db().execute(
+                    "SELECT download_count FROM community_papers WHERE id = ?", (pid,)
+                ).fetchone()[0]
+
+            CommunityPaperStoreDB.increment_downloads(pid)
+            assert count() == 1  # write-through when no interval is set
+
+            app.config["COUNTER_FLUSH_INTERVAL"] = 60
+            for _ in range(3):
+                CommunityPaperStoreDB.increment_downloads(pid)
+            assert count() == 1
+            _paper_downloads.flush(app)
+            assert count() == 4
+
+    def test_paper_downloads_kept_when_flush_fails(self, app, db, monkeypatch):
+        import sqlite3
+
+        import db_stores
+        with app.app_context():
+            from database import get_db
+            from db_stores import CommunityPaperStoreDB, _paper_downloads
+            pid = CommunityPaperStoreDB.create(1, "Paper 1", subject="Biology")
+            app.config["COUNTER_FLUSH_INTERVAL"] = 60
+            for _ in range(2):
+                CommunityPaperStoreDB.increment_downloads(pid)
+
+            def locked():
+                raise sqlite3.OperationalError("database is locked")
+
+            monkeypatch.setattr(db_stores, "get_db", locked)
+            _paper_downloads.flush(app)
+            monkeypatch.undo()
+
+            _paper_downloads.flush(app)
+            assert get_db().execute(
+                "SELECT download_count FROM community_papers WHERE id = ?", (pid,)
+            ).fetchone()[0] == 2
+
+    def test_leaderboard_rankings_materialized(self, app, db):
+        with app.app_context():
+            from database import get_db
+            from db_stores import LeaderboardStoreDB
+            live = LeaderboardStoreDB.get("global")
+            LeaderboardStoreDB.refresh()
+            assert LeaderboardStoreDB.get("global") == live
+
+            get_db().execute("UPDATE gamification SET total_xp = 999 WHERE user_id = 1")
+            get_db().commit()
+            # Served from the snapshot until the next refresh
+            assert LeaderboardStoreDB.get("global") == live
+            LeaderboardStoreDB.refresh()
+            top = LeaderboardStoreDB.get("global", limit=1)
+            assert top[0]["user_id"] == 1
+            assert top[0]["xp"] == 999
+            assert top[0]["rank"] == 1
+
 
 class TestVectorStore:
     def test_chromadb_store_protocol(self):
@@ -70,6 +172,71 @@ class TestVectorStore:
         assert vector_store._store is None
 
 
+class TestEngineManager:
+    def test_engine_built_once_under_concurrent_first_use(self, monkeypatch):
+        import threading
+        import time
+
+        import rag_engine
+        from extensions import EngineManager
+
+        built = []
+
+        class SlowEngine:
+            def __init__(self):
+                time.sleep(0.05)
+                built.append(self)
+
+        monkeypatch.setattr(rag_engine, "RAGEngine", SlowEngine)
+        EngineManager.reset()
+        try:
+            threads = [threading.Thread(target=EngineManager.get_engine) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert len(built) == 1
+            assert EngineManager.get_engine() is built[0]
+        finally:
+            EngineManager.reset()
+
+
+class TestBackgroundWritingAnalysis:
+    def test_analysis_runs_off_request_and_dedupes(self, app, monkeypatch):
+        import threading
+        import time
+
+        import helpers
+        from db_stores import WritingProfileDB
+        from extensions import EngineManager
+
+        release = threading.Event()
+        calls = []
+
+        class BlockingEngine:
+            def ask(self, prompt):
+                calls.append(prompt)
+                release.wait(5)
+                return "VERBOSITY: concise\nSUMMARY: Clear writer"
+
+        monkeypatch.setattr(EngineManager, "get_engine", classmethod(lambda cls: BlockingEngine()))
+        app.config["BACKGROUND_WORKERS"] = 1
+        with app.test_request_context():
+            helpers._analyze_writing_style("first exam")
+            helpers._analyze_writing_style("second exam")  # user already in flight
+        release.set()
+        for _ in range(100):
+            if not helpers._writing_in_flight:
+                break
+            time.sleep(0.05)
+
+        assert len(calls) == 1
+        with app.app_context():
+            profile = WritingProfileDB(1).load()
+            assert profile["verbosity"] == "concise"
+            assert profile["analyzed_count"] == 1
+
+
 class TestMigrationLocking:
     def test_migrations_apply_with_locking(self, app):
         """Migrations should complete successfully with file locking."""
@@ -83,6 +250,145 @@ class TestMigrationLocking:
             assert row is not None
 
 
+class TestQueryPlans:
+    def _plan(self, db, sql: str, params: tuple = ()) -> str:
+        rows = db.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        return " | ".join(r["detail"] for r in rows)
+
+    def test_class_analytics_use_covering_index(self, app):
+        with app.app_context():
+            from database import get_db
+            db = get_db()
+            plan = self._plan(
+                db,
+                "SELECT g.command_term, AVG(g.percentage), COUNT(*) "
+                "FROM grades g JOIN class_members cm ON g.user_id = cm.user_id "
+                "WHERE cm.class_id = ? AND g.command_term != '' GROUP BY g.command_term",
+                (1,),
+            )
+            assert "COVERING INDEX idx_grades_user_cmd" in plan
+
+    def test_student_progress_uses_covering_index(self, app):
+        with app.app_context():
+            from database import get_db
+            db = get_db()
+            plan = self._plan(
+                db,
+                "SELECT u.id, COUNT(g.id), AVG(g.percentage), MAX(g.timestamp) "
+                "FROM class_members cm JOIN users u ON cm.user_id = u.id "
+                "LEFT JOIN grades g ON g.user_id = u.id WHERE cm.class_id = ? GROUP BY u.id",
+                (1,),
+            )
+            assert "COVERING INDEX idx_grades_user_ts_pct" in plan
+
+    def test_next_milestone_uses_partial_index(self, app):
+        with app.app_context():
+            from database import get_db
+            plan = self._plan(
+                get_db(),
+                "SELECT id, title FROM milestones "
+                "WHERE user_id=? AND parent_type=? AND completed=0 ORDER BY sort_order LIMIT 1",
+                (1, "ee"),
+            )
+            assert "idx_milestones_next" in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_group_members_walk_role_index(self, app):
+        with app.app_context():
+            from database import get_db
+            plan = self._plan(
+                get_db(),
+                "SELECT u.id, u.name, gm.role FROM group_members gm "
+                "JOIN users u ON gm.user_id = u.id "
+                "WHERE gm.group_id = ? ORDER BY gm.role DESC, u.name",
+                (1,),
+            )
+            assert "COVERING INDEX idx_group_members_role" in plan
+            assert "RIGHT PART OF ORDER BY" in plan
+
+    def test_leaderboard_queries_use_covering_indexes(self, app):
+        with app.app_context():
+            from database import get_db
+            db = get_db()
+            plan = self._plan(
+                db,
+                "SELECT u.id, u.name, g.total_xp FROM gamification g "
+                "JOIN users u ON g.user_id = u.id ORDER BY g.total_xp DESC, g.user_id LIMIT ?",
+                (50,),
+            )
+            assert "COVERING INDEX idx_gamification_xp" in plan
+            assert "TEMP B-TREE" not in plan
+            plan = self._plan(
+                db,
+                "SELECT u.id FROM class_members cm "
+                "JOIN classes c ON cm.class_id = c.id JOIN users u ON cm.user_id = u.id "
+                "WHERE c.school_id = ?",
+                (1,),
+            )
+            assert "COVERING INDEX idx_classes_school" in plan
+
+    def test_cas_totals_use_covering_index(self, app):
+        with app.app_context():
+            from database import get_db
+            from db_stores import _CAS_TOTALS_SQL
+            plan = self._plan(get_db(), _CAS_TOTALS_SQL, (1,))
+            assert "COVERING INDEX idx_cas_user_strand" in plan
+
+    def test_history_listings_read_index_in_order(self, app):
+        with app.app_context():
+            from database import get_db
+            db = get_db()
+            plan = self._plan(
+                db,
+                "SELECT id, subject, topic, created_at, updated_at FROM tutor_conversations "
+                "WHERE user_id = ? ORDER BY updated_at DESC LIMIT ?",
+                (1, 20),
+            )
+            assert "COVERING INDEX idx_tutor_user_updated" in plan
+            assert "TEMP B-TREE" not in plan
+            plan = self._plan(
+                db,
+                "SELECT * FROM exam_sessions WHERE user_id = ? ORDER BY started_at DESC LIMIT ?",
+                (1, 20),
+            )
+            assert "idx_exam_sessions_user_started" in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_examiner_listings_read_index_in_order(self, app):
+        with app.app_context():
+            from database import get_db
+            db = get_db()
+            plan = self._plan(
+                db,
+                "SELECT id, title FROM examiner_reviews WHERE user_id = ? ORDER BY submitted_at DESC",
+                (1,),
+            )
+            assert "idx_examiner_reviews_user_submitted" in plan
+            assert "TEMP B-TREE" not in plan
+            plan = self._plan(
+                db,
+                "SELECT er.id, u.name FROM examiner_reviews er JOIN users u ON er.user_id = u.id "
+                "WHERE er.status IN ('submitted', 'assigned') ORDER BY er.submitted_at ASC",
+            )
+            assert "idx_examiner_reviews_queue" in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_ability_and_ratings_clustered_on_primary_key(self, app):
+        with app.app_context():
+            from database import get_db
+            db = get_db()
+            plan = self._plan(
+                db,
+                "SELECT * FROM student_ability WHERE user_id = ? AND subject = ? AND topic = ?",
+                (1, "Biology", "Cells"),
+            )
+            assert plan == "SEARCH student_ability USING PRIMARY KEY (user_id=? AND subject=? AND topic=?)"
+            plan = self._plan(
+                db, "SELECT rating FROM paper_ratings WHERE paper_id = ? AND user_id = ?", (1, 1),
+            )
+            assert plan == "SEARCH paper_ratings USING PRIMARY KEY (paper_id=? AND user_id=?)"
+
+
 class TestPaginationHelpers:
     def test_paginated_response_math(self):
         from helpers import paginated_response
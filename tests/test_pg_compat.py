@@ -2,8 +2,18 @@
 
 from __future__ import annotations
 
+from unittest.mock import MagicMock
+
 import pytest
-from pg_compat import PgRow, _translate_sql, _translate_schema, is_postgres_url
+
+from pg_compat import (
+    PgConnectionWrapper,
+    PgCursorWrapper,
+    PgRow,
+    _translate_schema,
+    _translate_sql,
+    is_postgres_url,
+)
 
 
 class TestPgRow:
@@ -20,6 +30,11 @@ class TestPgRow:
         assert row[0] == 42
         assert row[1] == "Bob"
 
+    def test_unpack_keeps_duplicate_column_names(self):
+        row = PgRow(["id", "name", "name"], (1, "Alice", "Biology"))
+        uid, name, subject = row
+        assert (uid, name, subject) == (1, "Alice", "Biology")
+
     def test_keys(self):
         row = PgRow(["a", "b", "c"], (1, 2, 3))
         assert row.keys() == ["a", "b", "c"]
@@ -61,6 +76,10 @@ class TestTranslateSQL:
         assert "ON CONFLICT DO NOTHING" in result
         assert "OR IGNORE" not in result
 
+    def test_insert_or_ignore_before_returning(self):
+        result = _translate_sql("INSERT OR IGNORE INTO t (a) VALUES (?) RETURNING a")
+        assert result == "INSERT INTO t (a) VALUES (%s) ON CONFLICT DO NOTHING RETURNING a"
+
     def test_regular_insert_unchanged(self):
         result = _translate_sql("INSERT INTO users (name) VALUES (?)")
         assert "ON CONFLICT DO NOTHING" not in result
@@ -73,6 +92,11 @@ class TestTranslateSQL:
 class TestTranslateSchema:
     """Test schema DDL translation."""
 
+    def test_without_rowid_stripped(self):
+        result = _translate_schema("CREATE TABLE t (a INTEGER, PRIMARY KEY(a)) WITHOUT ROWID;")
+        assert "WITHOUT ROWID" not in result
+        assert result.rstrip().endswith(");")
+
     def test_autoincrement_to_serial(self):
         result = _translate_schema("id INTEGER PRIMARY KEY AUTOINCREMENT")
         assert "SERIAL PRIMARY KEY" in result
@@ -88,6 +112,25 @@ class TestTranslateSchema:
         assert result == sql
 
 
+class TestWrappers:
+    """Test cursor/connection wrappers against a mocked psycopg2 cursor."""
+
+    def test_cursor_iteration_yields_rows(self):
+        raw = MagicMock()
+        raw.description = [("id",), ("name",)]
+        raw.fetchmany.side_effect = [[(1, "a"), (2, "b")], []]
+        rows = list(PgCursorWrapper(raw))
+        assert [r["name"] for r in rows] == ["a", "b"]
+
+    def test_executemany_translates_sql(self):
+        conn = MagicMock()
+        wrapper = PgConnectionWrapper(conn)
+        wrapper.executemany("INSERT OR IGNORE INTO t (a) VALUES (?)", [(1,), (2,)])
+        conn.cursor.return_value.executemany.assert_called_once_with(
+            "INSERT INTO t (a) VALUES (%s) ON CONFLICT DO NOTHING", [(1,), (2,)],
+        )
+
+
 class TestIsPostgresUrl:
     """Test URL detection."""
 
@@ -13,7 +13,7 @@ if "pypdf" not in sys.modules:
 
 import pytest
 
-from ingest import validate_chunk, chunk_text
+from ingest import chunk_text, validate_chunk
 from rag_engine import RetrievedChunk
 
 
@@ -87,7 +87,7 @@ class TestMigration34:
 class TestRAGCitationStoreDB:
     def test_record_and_retrieve(self, app):
         with app.app_context():
-            from db_stores import RAGCitationStoreDB, AgentInteractionStoreDB
+            from db_stores import AgentInteractionStoreDB, RAGCitationStoreDB
 
             iid = AgentInteractionStoreDB.log(
                 user_id=1, intent="explain_concept", agent="tutor_agent",
@@ -137,3 +137,64 @@ class TestChunkTextIntegration:
         for c in chunks:
             valid, _ = validate_chunk(c)
             assert valid, f"Chunk failed validation: {c[:50]}..."
+
+
+class TestExtractText:
+    def test_prefers_pymupdf_and_skips_blank_pages(self, monkeypatch, tmp_path):
+        import ingest
+
+        pages = [MagicMock(), MagicMock(), MagicMock()]
+        for page, text in zip(pages, ["Question 1", "", "Question 2"]):
+            page.get_text.return_value = text
+        doc = MagicMock()
+        doc.__enter__.return_value = pages
+        fake_fitz = MagicMock()
+        fake_fitz.open.return_value = doc
+        monkeypatch.setattr(ingest, "fitz", fake_fitz)
+        monkeypatch.setattr(ingest, "PdfReader", MagicMock(side_effect=AssertionError))
+
+        assert ingest.extract_text(tmp_path / "paper.pdf") == "Question 1\n\nQuestion 2"
+        fake_fitz.open.assert_called_once_with(str(tmp_path / "paper.pdf"))
+        doc.__exit__.assert_called_once()
+
+
+class TestBatchedIngest:
+    TEXT = (
+        "Question 1\n\nExplain the process of natural selection. Natural selection "
+        "is a key mechanism of evolution that acts on the phenotype of organisms."
+    )
+
+    def test_chunks_from_several_pdfs_share_one_add(self, monkeypatch, tmp_path):
+        import ingest
+
+        for name in ("a.pdf", "b.pdf", "c.pdf"):
+            (tmp_path / name).write_bytes(name.encode())
+        collection = MagicMock()
+        collection.count.return_value = 0
+        client = MagicMock()
+        client.get_or_create_collection.return_value = collection
+        monkeypatch.setattr(ingest, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(ingest, "chromadb", MagicMock(PersistentClient=MagicMock(return_value=client)))
+        monkeypatch.setattr(ingest, "extract_text", lambda pdf: self.TEXT)
+
+        ingest.ingest()
+
+        collection.add.assert_called_once()
+        sources = {m["source"] for m in collection.add.call_args.kwargs["metadatas"]}
+        assert sources == {"a.pdf", "b.pdf", "c.pdf"}
+
+    def test_uploaded_file_added_in_slices(self, monkeypatch, tmp_path):
+        import ingest
+        import vector_store
+
+        upload = tmp_path / "notes.pdf"
+        upload.write_bytes(b"pdf")
+        store = MagicMock()
+        monkeypatch.setattr(vector_store, "get_vector_store", lambda: store)
+        monkeypatch.setattr(ingest, "extract_text", lambda path: self.TEXT)
+        monkeypatch.setattr(ingest, "chunk_text", lambda text: ["one", "two", "three"])
+
+        result = ingest.ingest_uploaded_file(str(upload), "notes.pdf", "notes", batch_size=2)
+
+        assert result["chunks"] == 3
+        assert [c.kwargs["documents"] for c in store.add.call_args_list] == [["one", "two"], ["three"]]
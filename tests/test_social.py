@@ -1,6 +1,7 @@
 """Tests for shared flashcards and study buddy features."""
 
 import json
+
 import pytest
 
 
@@ -96,10 +97,37 @@ class TestStudyBuddy:
         data = resp.get_json()
         assert "matches" in data
 
-    def test_connect_sends_notification(self, auth_client, app):
+    def test_find_matches_ranks_by_overlap(self, auth_client, app):
         with app.app_context():
             from database import get_db
+            from db_stores import StudyBuddyDB
+            db = get_db()
+            for uid, name in ((10, "One Shared"), (11, "Two Shared"), (12, "None Shared")):
+                db.execute(
+                    "INSERT INTO users (id, name, email, password_hash, created_at) "
+                    "VALUES (?, ?, ?, 'x', '2026-01-01')",
+                    (uid, name, f"user{uid}@test.com"),
+                )
+            db.commit()
+            StudyBuddyDB.save_preferences(1, ["Biology", "Chemistry", "History"])
+            StudyBuddyDB.save_preferences(10, ["Biology"])
+            StudyBuddyDB.save_preferences(11, ["Chemistry", "History", "Physics"])
+            StudyBuddyDB.save_preferences(12, ["Physics"])
+
+            matches = StudyBuddyDB.find_matches(1)
+            assert [m["user_id"] for m in matches] == [11, 10]
+            assert sorted(matches[0]["common_subjects"]) == ["Chemistry", "History"]
+            assert StudyBuddyDB.find_matches(1, limit=1)[0]["name"] == "Two Shared"
+
+            # Re-saving replaces the subject set
+            StudyBuddyDB.save_preferences(11, ["Physics"])
+            assert [m["user_id"] for m in StudyBuddyDB.find_matches(1)] == [10]
+
+    def test_connect_sends_notification(self, auth_client, app):
+        with app.app_context():
             from werkzeug.security import generate_password_hash
+
+            from database import get_db
             db = get_db()
             # Create another user to connect with
             db.execute(
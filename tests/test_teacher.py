@@ -1,9 +1,10 @@
 """Tests for teacher dashboard, analytics, and SOS alerts."""
 
 import json
-import pytest
 from datetime import datetime
 
+import pytest
+
 
 class TestTeacherDashboard:
     def test_teacher_dashboard_loads(self, teacher_client):
@@ -103,6 +104,25 @@ class TestTeacherAnalytics:
         data = resp.get_json()
         assert "at_risk_students" in data
 
+    def test_at_risk_reasons(self, teacher_client, app):
+        with app.app_context():
+            from database import get_db
+            from db_stores import ClassStoreDB
+            db = get_db()
+            students = ClassStoreDB.at_risk_students(1)
+            assert students[0]["risk_reasons"] == ["Inactive 7+ days", "No activity"]
+
+            db.execute(
+                "INSERT INTO grades (user_id, subject, subject_display, level, command_term, "
+                "grade, percentage, mark_earned, mark_total, topic, timestamp) "
+                "VALUES (1, 'biology', 'Biology', 'HL', 'Explain', 2, 30, 1, 4, 'Cells', ?)",
+                (datetime.now().isoformat(),),
+            )
+            db.commit()
+            students = ClassStoreDB.at_risk_students(1)
+            assert students[0]["risk_reasons"] == ["Low average (30.0%)"]
+            assert students[0]["avg_pct"] == 30
+
 
 class TestTeacherSOS:
     def test_sos_alerts_endpoint(self, teacher_client):
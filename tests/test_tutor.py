@@ -1,9 +1,10 @@
 """Tests for tutor chat experience."""
 
-import json
 import io
+import json
+from unittest.mock import MagicMock, patch
+
 import pytest
-from unittest.mock import patch, MagicMock
 
 
 class TestTutorPage:
@@ -61,6 +62,19 @@ class TestTutorConversation:
         assert "follow_ups" in data
         assert isinstance(data["follow_ups"], list)
 
+    def test_store_appends_messages(self, app, auth_client):
+        with app.app_context():
+            from db_stores import TutorConversationStoreDB
+            store = TutorConversationStoreDB(1)
+            conv_id = store.create("Biology", "Cells")
+            store.add_message(conv_id, "user", 'Why "ATP"?')
+            store.add_message(conv_id, "assistant", "Energy currency.")
+            TutorConversationStoreDB(2).add_message(conv_id, "user", "not mine")
+            messages = store.get(conv_id)["messages"]
+            assert [(m["role"], m["content"]) for m in messages] == [
+                ("user", 'Why "ATP"?'), ("assistant", "Energy currency."),
+            ]
+
     def test_get_history(self, auth_client):
         resp = auth_client.get("/api/tutor/history")
         assert resp.status_code == 200
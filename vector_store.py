@@ -14,6 +14,7 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 from pathlib import Path
 from typing import Any, Protocol
 
@@ -66,18 +67,21 @@ class ChromaDBStore:
         self._collection_name = collection_name
         self._client = None
         self._collection = None
+        self._lock = threading.Lock()
 
     def _get_collection(self):
         if self._collection is None:
-            try:
-                import chromadb
-            except ImportError:
-                raise RuntimeError("chromadb is not installed — vector search unavailable")
-            self._client = chromadb.PersistentClient(path=self._chroma_dir)
-            self._collection = self._client.get_or_create_collection(
-                name=self._collection_name,
-                metadata={"hnsw:space": "cosine"},
-            )
+            with self._lock:
+                if self._collection is None:
+                    try:
+                        import chromadb
+                    except ImportError:
+                        raise RuntimeError("chromadb is not installed — vector search unavailable")
+                    self._client = chromadb.PersistentClient(path=self._chroma_dir)
+                    self._collection = self._client.get_or_create_collection(
+                        name=self._collection_name,
+                        metadata={"hnsw:space": "cosine"},
+                    )
         return self._collection
 
     def add(self, ids: list[str], documents: list[str],
@@ -118,8 +122,10 @@ class ChromaDBStore:
         return col.count()
 
 
-# Module-level singleton
+# Module-level singleton; the lock stops concurrent first callers (e.g. the
+# grader's parallel retrievals) from each building a client
 _store: VectorStore | None = None
+_store_lock = threading.Lock()
 
 
 def get_vector_store(chroma_dir: str | Path | None = None,
@@ -127,14 +133,17 @@ def get_vector_store(chroma_dir: str | Path | None = None,
     """Factory function returning the vector store singleton."""
     global _store
     if _store is None:
-        if os.environ.get("VERCEL"):
-            _store = NullVectorStore()
-        else:
-            _store = ChromaDBStore(chroma_dir=chroma_dir, collection_name=collection_name)
+        with _store_lock:
+            if _store is None:
+                if os.environ.get("VERCEL"):
+                    _store = NullVectorStore()
+                else:
+                    _store = ChromaDBStore(chroma_dir=chroma_dir, collection_name=collection_name)
     return _store
 
 
 def reset_vector_store() -> None:
     """Reset the singleton (called after doc upload/delete)."""
     global _store
-    _store = None
+    with _store_lock:
+        _store = None